@@ -1,12 +1,5 @@
 import streamlit as st
-import warnings
-import joblib 
-import pandas 
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import sklearn
-from sklearn.exceptions import InconsistentVersionWarning
-warnings.filterwarnings(action='ignore', category=InconsistentVersionWarning)
+import startup
 
 # Set the page configuration
 st.set_page_config(
@@ -164,6 +157,17 @@ st.components.v1.html("""
   </script>
 </div>
 <!-- TradingView Widget END -->""" , height=500,width=2000)
+
+# Local correlation heat map and currency strength computed from the bundled price data
+st.subheader('Cross-Pair Correlation And Currency Strength')
+if st.checkbox('Show the locally computed correlation heat map'):
+    import correlation
+    col1, col2 = st.columns(2)
+    with col1:
+        heat_map_timeframe = st.selectbox('Timeframe', ['M30', 'H1', 'H4', 'D1'], index=1)
+    with col2:
+        heat_map_window = st.number_input('Window (bars)', min_value=20, max_value=2000, value=correlation.DEFAULT_WINDOW, step=10)
+    correlation.render_heat_map(heat_map_timeframe, int(heat_map_window))
 st.markdown("---")
 # Technical Analysis Section
 st.markdown("<h2 style='text-align: center; color: #4CAF50;'>Harness the Power of Technical Analysis</h2>", unsafe_allow_html=True)
@@ -260,3 +264,7 @@ st.write("""
     Our platform integrates technical and fundamental analysis to provide a comprehensive approach to Forex trading. 
     Whether you're focusing on short-term trades or long-term investments, the insights and tools available here will support your trading decisions and enhance your market strategy.
 """)
+
+# Preload configured models and data now that the page has been served
+startup.start_warmup()
+startup.render_import_report()
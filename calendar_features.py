@@ -0,0 +1,187 @@
+"""Batch feature derivation and scoring for the economic calendar models.
+
+The single-row form on the Celender page asks for Previous, Consensus, Consensus_Lag,
+Actual_Lag, Previous_Lag, Impact_encoder and N_Event_encoder by hand. Here they are
+derived for every historical release in ``celender.csv``: the lag columns are group-wise
+shifts per (Currency, Event) and the encoders come from ``impact.csv`` and
+``{currency}_event.csv``. Each currency model is then scored with one ``predict`` call.
+``get_scored`` keeps the scored frames in memory until a source file changes.
+
+Release times are naive timestamps in CALENDAR_TZ (FOREX_CALENDAR_TZ, default ``UTC``);
+times with an offset in the file are converted to it, and ``calendar_now()`` gives the
+current time on the same clock.
+"""
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+import perf
+import startup
+
+CURRENCIES = ['EUR', 'USD', 'GBP', 'CHF', 'NZD', 'CAD', 'AUD', 'JPY']
+FEATURES = ['Previous', 'Consensus', 'Consensus_Lag', 'Actual_Lag', 'Previous_Lag', 'Impact_encoder', 'N_Event_encoder']
+CALENDAR_FILE = 'celender.csv'
+IMPACT_FILE = 'impact.csv'
+CALENDAR_TZ = os.environ.get('FOREX_CALENDAR_TZ', 'UTC')
+
+_lock = threading.Lock()
+_scored = {}
+
+# Multipliers for the unit suffixes used in calendar values such as "250K" or "1.2B"
+_SUFFIXES = {'K': 1e3, 'M': 1e6, 'B': 1e9, 'T': 1e12}
+
+
+def get_model_filename(currency):
+    return f'{currency}.pkl'
+
+
+def get_encoder_filename(currency):
+    return f'{currency}_event.csv'
+
+
+def parse_values(values):
+    """Convert calendar values like "1.5%", "250K" or "-0.3B" to floats, NaN when missing."""
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype(float)
+    text = values.astype(str).str.strip().str.replace(',', '', regex=False).str.rstrip('%')
+    suffix = text.str[-1:].str.upper()
+    multiplier = suffix.map(_SUFFIXES)
+    number = pd.to_numeric(text.where(multiplier.isna(), text.str[:-1]), errors='coerce')
+    return number * multiplier.fillna(1.0)
+
+
+def encoder_mapping(df):
+    """Turn an encoder table (label column plus a ``*_encoder`` column) into a dict."""
+    encoded = [col for col in df.columns if col.endswith('_encoder')]
+    label = [col for col in df.columns if col not in encoded]
+    if not encoded or not label:
+        raise ValueError(f"Encoder table needs a label and an *_encoder column, got {list(df.columns)}")
+    return dict(zip(df[label[0]], df[encoded[0]]))
+
+
+def to_calendar_time(values):
+    """Parse release times as naive timestamps in CALENDAR_TZ; unparseable values become NaT."""
+    try:
+        times = pd.to_datetime(values, errors='coerce')
+    except ValueError:
+        times = None
+    if times is None or not pd.api.types.is_datetime64_any_dtype(times):
+        # Mixed UTC offsets only parse onto a common UTC clock
+        times = pd.to_datetime(values, errors='coerce', utc=True)
+    if times.dt.tz is not None:
+        times = times.dt.tz_convert(CALENDAR_TZ).dt.tz_localize(None)
+    return times
+
+
+def calendar_now():
+    """Return the current time as a naive timestamp in CALENDAR_TZ."""
+    return pd.Timestamp.now(tz=CALENDAR_TZ).tz_localize(None)
+
+
+def load_calendar():
+    """Load the full event history with parsed values, sorted by release time."""
+    calendar = startup.load_csv(CALENDAR_FILE, 'calendar').copy()
+    calendar['Datetime'] = to_calendar_time(calendar['Datetime'])
+    for col in ('Previous', 'Consensus', 'Actual'):
+        calendar[col] = parse_values(calendar[col])
+    return calendar.sort_values('Datetime', kind='stable').reset_index(drop=True)
+
+
+def build_features(events, impact_map, event_map):
+    """Derive the model features for every row of one currency's event history.
+
+    The lag columns take the value of the previous release of the same event, so the first
+    release of every event has NaN lags.
+    """
+    features = events.copy()
+    grouped = features.groupby('Event', sort=False)
+    features['Consensus_Lag'] = grouped['Consensus'].shift(1)
+    features['Actual_Lag'] = grouped['Actual'].shift(1)
+    features['Previous_Lag'] = grouped['Previous'].shift(1)
+    features['Impact_encoder'] = features['Impact'].map(impact_map)
+    features['N_Event_encoder'] = features['Event'].map(event_map)
+    return features
+
+
+def score_currency(currency, calendar, impact_map):
+    """Build features for one currency and score every complete row in one batch."""
+    events = calendar[calendar['Currency'] == currency]
+    event_map = encoder_mapping(startup.load_csv(get_encoder_filename(currency)))
+    features = build_features(events, impact_map, event_map)
+
+    complete = features[FEATURES].notna().all(axis=1).to_numpy()
+    prediction = np.full(len(features), np.nan)
+    if complete.any():
+        model = startup.load_model(get_model_filename(currency))
+        with perf.timed('predict_batch', currency):
+            prediction[complete] = model.predict(features.loc[complete, FEATURES])
+
+    features['Prediction'] = prediction
+    features['Predicted_Surprise'] = features['Prediction'] - features['Consensus']
+    features['Actual_Surprise'] = features['Actual'] - features['Consensus']
+    return features
+
+
+def score_calendar(currencies=CURRENCIES):
+    """Score the whole calendar for the given currencies, one predict call per model."""
+    calendar = load_calendar()
+    impact_map = encoder_mapping(startup.load_csv(IMPACT_FILE))
+    scored = {}
+    for currency in currencies:
+        if startup.model_exists(get_model_filename(currency)) and os.path.isfile(get_encoder_filename(currency)):
+            scored[currency] = score_currency(currency, calendar, impact_map)
+    return scored
+
+
+def source_stamp(filenames):
+    """Return the name, size and mtime of every existing file in ``filenames``."""
+    stamp = []
+    for filename in filenames:
+        if os.path.isfile(filename):
+            stat = os.stat(filename)
+            stamp.append((filename, stat.st_size, stat.st_mtime_ns))
+    return tuple(stamp)
+
+
+def _source_stamp(currencies):
+    """Return the size/mtime of every file the scores of ``currencies`` depend on."""
+    files = [CALENDAR_FILE, IMPACT_FILE, startup.lazy_import('model_archive').ARCHIVE_FILE]
+    for currency in currencies:
+        files += [get_model_filename(currency), get_encoder_filename(currency)]
+    return source_stamp(files)
+
+
+def get_scored(currencies=CURRENCIES):
+    """Return ``score_calendar(currencies)``, cached until one of its source files changes.
+
+    Callers must not modify the returned frames.
+    """
+    key = frozenset(currencies)
+    stamp = _source_stamp(sorted(key))
+    with _lock:
+        cached = _scored.get(key)
+    if cached is None or cached[0] != stamp:
+        cached = (stamp, score_calendar(sorted(key)))
+        with _lock:
+            _scored[key] = cached
+    # Keep the caller's currency order
+    return {currency: cached[1][currency] for currency in currencies if currency in cached[1]}
+
+
+def surprise_summary(scored):
+    """Summarise predicted vs actual surprise per currency."""
+    rows = []
+    for currency, features in scored.items():
+        scored_rows = features.dropna(subset=['Prediction', 'Actual'])
+        error = scored_rows['Prediction'] - scored_rows['Actual']
+        same_sign = np.sign(scored_rows['Predicted_Surprise']) == np.sign(scored_rows['Actual_Surprise'])
+        rows.append({
+            'Currency': currency,
+            'Events': len(features),
+            'Scored': len(scored_rows),
+            'MAE': error.abs().mean(),
+            'Surprise_Direction_Hit_Rate': same_sign.mean() if len(scored_rows) else np.nan,
+        })
+    return pd.DataFrame(rows)
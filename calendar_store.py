@@ -0,0 +1,130 @@
+"""Indexed store over the economic calendar of all currencies.
+
+The calendar is sorted by release time once; per-currency and per-(currency, event) row
+positions and release times are kept as sorted arrays, so "next K events", "history of
+event X" and "events in a window" are answered with ``np.searchsorted`` instead of
+scanning the whole frame.
+The Impact and N_Event encoder mappings are precomputed and attached as columns.
+"""
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+import calendar_features
+import startup
+
+_lock = threading.Lock()
+_store = None
+_stamp = None
+
+_EMPTY = np.empty(0, dtype=np.intp)
+_NO_TIMES = np.empty(0, dtype='datetime64[ns]')
+
+
+def _as_time(value):
+    return np.datetime64(pd.Timestamp(value).to_datetime64(), 'ns')
+
+
+class CalendarStore:
+    """Economic calendar indexed by datetime, by currency and by (currency, event)."""
+
+    def __init__(self, calendar, impact_map, event_maps):
+        frame = calendar.dropna(subset=['Datetime']).sort_values('Datetime', kind='stable').reset_index(drop=True)
+        frame['Impact_encoder'] = frame['Impact'].map(impact_map)
+        frame['N_Event_encoder'] = np.nan
+        for currency, event_map in event_maps.items():
+            rows = frame['Currency'] == currency
+            frame.loc[rows, 'N_Event_encoder'] = frame.loc[rows, 'Event'].map(event_map)
+
+        self.frame = frame
+        self.impact_map = impact_map
+        self.event_maps = event_maps
+        self.times = frame['Datetime'].to_numpy(dtype='datetime64[ns]')
+        # groupby().indices yields ascending positions, so each array is also time-ordered
+        self.by_currency = frame.groupby('Currency', sort=False).indices
+        self.by_event = frame.groupby(['Currency', 'Event'], sort=False).indices
+        # Release times of each group, so window queries never gather from self.times
+        self.currency_times = {key: self.times[positions] for key, positions in self.by_currency.items()}
+        self.event_times = {key: self.times[positions] for key, positions in self.by_event.items()}
+
+    def __len__(self):
+        return len(self.frame)
+
+    def _positions(self, currency=None):
+        """Return the row positions and release times of ``currency``, or (None, all times)."""
+        if currency is None:
+            return None, self.times
+        return self.by_currency.get(currency, _EMPTY), self.currency_times.get(currency, _NO_TIMES)
+
+    def _window(self, positions, times, start, end):
+        """Slice ``positions`` (or all rows when None) to start <= time < end."""
+        lo = 0 if start is None else np.searchsorted(times, _as_time(start), side='left')
+        hi = len(times) if end is None else np.searchsorted(times, _as_time(end), side='left')
+        if positions is None:
+            return np.arange(lo, hi)
+        return positions[lo:hi]
+
+    def next_events(self, k, after, currency=None):
+        """Return the next ``k`` events released at or after ``after``."""
+        positions = self._window(*self._positions(currency), after, None)
+        return self.frame.iloc[positions[:k]]
+
+    def events_between(self, start, end, currency=None):
+        """Return the events released in [start, end)."""
+        return self.frame.iloc[self._window(*self._positions(currency), start, end)]
+
+    def event_history(self, currency, event, start=None, end=None):
+        """Return every release of one event, optionally limited to [start, end)."""
+        key = (currency, event)
+        positions = self.by_event.get(key, _EMPTY)
+        return self.frame.iloc[self._window(positions, self.event_times.get(key, _NO_TIMES), start, end)]
+
+    def events(self, currency):
+        """Return the event names known for ``currency``."""
+        return sorted(event for cur, event in self.by_event if cur == currency)
+
+    def encode(self, currency, event, impact):
+        """Return (Impact_encoder, N_Event_encoder) for an event, None where unknown."""
+        return self.impact_map.get(impact), self.event_maps.get(currency, {}).get(event)
+
+
+def build_store(currencies=calendar_features.CURRENCIES):
+    """Build a store from ``celender.csv``, ``impact.csv`` and the per-currency encoder tables."""
+    calendar = calendar_features.load_calendar()
+    impact_map = calendar_features.encoder_mapping(startup.load_csv(calendar_features.IMPACT_FILE))
+    event_maps = {}
+    for currency in currencies:
+        filename = calendar_features.get_encoder_filename(currency)
+        if os.path.isfile(filename):
+            event_maps[currency] = calendar_features.encoder_mapping(startup.load_csv(filename))
+    return CalendarStore(calendar[calendar['Currency'].isin(currencies)], impact_map, event_maps)
+
+
+def _source_files(currencies=calendar_features.CURRENCIES):
+    files = [calendar_features.CALENDAR_FILE, calendar_features.IMPACT_FILE]
+    return files + [calendar_features.get_encoder_filename(currency) for currency in currencies]
+
+
+def get_store():
+    """Return the process-wide store, rebuilt whenever one of its source files changes."""
+    global _store, _stamp
+    stamp = calendar_features.source_stamp(_source_files())
+    with _lock:
+        if _store is None or _stamp != stamp:
+            _store, _stamp = build_store(), stamp
+        return _store
+
+
+def page_count(rows, page_size):
+    """Return the number of pages needed for ``rows`` rows, at least one."""
+    return max(1, -(-rows // page_size))
+
+
+def page(df, page_size, page_number):
+    """Return one page (1-based) of ``df`` and the total number of pages."""
+    pages = page_count(len(df), page_size)
+    page_number = min(max(1, page_number), pages)
+    start = (page_number - 1) * page_size
+    return df.iloc[start:start + page_size], pages
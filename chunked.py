@@ -0,0 +1,120 @@
+"""Out-of-core processing of price histories too large to load at once.
+
+``stream_features`` reads ``forex_{symbol}_{timeframe}.csv`` in fixed-size chunks with
+``pd.read_csv(chunksize=...)`` and yields model features per chunk. The indicator columns
+shipped in the file are used when present; otherwise the EMA/MACD state is carried across
+chunk boundaries. The last two bars are carried too, so the output is identical to
+``features.bar_features`` on the whole file while peak memory stays proportional to the
+chunk size. The file must already be in time order.
+
+Run ``python chunked.py EURUSD H1 50000`` to compare the streamed and in-memory results.
+"""
+import sys
+
+import numpy as np
+import pandas as pd
+
+import features
+import market
+import startup
+
+DEFAULT_CHUNK = 100_000
+PRICE_FIELDS = ('open', 'high', 'low', 'close')
+
+# Rows of context carried into the next chunk for the lag features
+_LAGS = 2
+
+
+def stream_bars(symbol, timeframe, chunk_size=DEFAULT_CHUNK):
+    """Yield the timestamp, OHLC and shipped indicator columns of one price file, chunk by chunk."""
+    filename = market.get_dataframe_filename(symbol, timeframe)
+    header = pd.read_csv(filename, nrows=0).columns
+    time_column = market.find_time_column(header)
+    fields = [*PRICE_FIELDS, *features.shipped_indicators(header)]
+    for chunk in pd.read_csv(filename, usecols=[time_column, *fields], chunksize=chunk_size):
+        chunk['time'] = pd.to_datetime(chunk.pop(time_column))
+        yield chunk[['time', *fields]]
+
+
+def stream_features(symbol, timeframe, chunk_size=DEFAULT_CHUNK):
+    """Yield (bars, features) per chunk, carrying indicator and lag state across chunks."""
+    pip_size = market.pip_sizes[symbol]
+    state = None
+    tail_bars = tail_ind = None
+    for bars in stream_bars(symbol, timeframe, chunk_size):
+        shipped = features.shipped_indicators(bars.columns)
+        ind = bars[shipped] if shipped else features.indicators(bars['close'], state)
+        if tail_bars is None:
+            context_bars, context_ind = bars, ind
+        else:
+            context_bars = pd.concat([tail_bars, bars])
+            context_ind = pd.concat([tail_ind, ind])
+        feats = features.features_from_indicators(context_bars, context_ind, pip_size)
+        yield bars, feats.iloc[len(context_bars) - len(bars):]
+
+        state = ind.iloc[-1]
+        tail_bars = context_bars.iloc[-_LAGS:]
+        tail_ind = context_ind.iloc[-_LAGS:]
+
+
+def backtest_chunks(symbol, timeframe, chunk_size=DEFAULT_CHUNK):
+    """Yield the pips of the trades settled in each chunk of the BUY/SELL rule backtest.
+
+    Each trade is entered at a bar's close and exited at the next close, so the last bar of
+    a chunk is settled with the first close of the next one.
+    """
+    model = startup.load_model(market.get_model_filename(symbol, timeframe))
+    pip_size = market.pip_sizes[symbol]
+    pending = None  # (open, prediction, close) of the previous chunk's last bar
+    for bars, feats in stream_features(symbol, timeframe, chunk_size):
+        open_price = bars['open'].to_numpy(dtype=np.float64)
+        close = bars['close'].to_numpy(dtype=np.float64)
+        complete = feats.notna().all(axis=1).to_numpy()
+        # Incomplete rows keep a NaN prediction and so a NaN return, dropped below
+        prediction = np.full(len(bars), np.nan)
+        if complete.any():
+            prediction[complete] = model.predict(feats[complete].to_numpy())
+        returns = features.strategy_returns(open_price, prediction, features.next_close_moves(bars, pip_size))
+        if pending is not None:
+            last_open, last_prediction, last_close = pending
+            settled = features.strategy_returns(last_open, last_prediction, (close[0] - last_close) / pip_size)
+            returns = np.concatenate([[settled], returns])
+        pending = open_price[-1], prediction[-1], close[-1]
+        yield returns[~np.isnan(returns)]
+
+
+def stream_backtest(symbol, timeframe, chunk_size=DEFAULT_CHUNK):
+    """Backtest the BUY/SELL rule chunk by chunk and return its totals.
+
+    Only running totals carry across chunks (trade count, equity and its peak for the
+    drawdown), so memory stays bounded by the chunk size however long the history is.
+    """
+    trades = 0
+    equity = peak = max_drawdown = 0.0
+    for returns in backtest_chunks(symbol, timeframe, chunk_size):
+        if not len(returns):
+            continue
+        curve = equity + np.cumsum(returns)
+        running_peak = np.maximum.accumulate(np.maximum(curve, peak))
+        max_drawdown = max(max_drawdown, float((running_peak - curve).max()))
+        equity, peak = float(curve[-1]), float(running_peak[-1])
+        trades += len(returns)
+    return {'bars': trades, 'pnl_pips': equity, 'max_drawdown_pips': max_drawdown}
+
+
+def compare_with_memory(symbol, timeframe, chunk_size=DEFAULT_CHUNK):
+    """Return the largest absolute difference between streamed and in-memory features."""
+    streamed = pd.concat([feats for _, feats in stream_features(symbol, timeframe, chunk_size)], ignore_index=True)
+    bars = features.load_history(symbol, timeframe)
+    in_memory = features.bar_features(bars, market.pip_sizes[symbol])
+    same_nan = np.array_equal(streamed.isna().to_numpy(), in_memory.isna().to_numpy())
+    difference = np.nanmax(np.abs(streamed.to_numpy() - in_memory.to_numpy()))
+    return same_nan, float(difference)
+
+
+if __name__ == '__main__':
+    symbol = sys.argv[1] if len(sys.argv) > 1 else 'EURUSD'
+    timeframe = sys.argv[2] if len(sys.argv) > 2 else 'H1'
+    chunk_size = int(sys.argv[3]) if len(sys.argv) > 3 else DEFAULT_CHUNK
+    same_nan, difference = compare_with_memory(symbol, timeframe, chunk_size)
+    print(f'same missing values: {same_nan}, max abs difference: {difference}')
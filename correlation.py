@@ -0,0 +1,257 @@
+"""Rolling cross-pair correlation and currency-strength engine.
+
+Works on the close-to-close log returns of the aligned panel (see ``panel.py``). Both
+engines keep a ring buffer of the last ``window`` rows together with running sums, so each
+new bar updates the state in O(1) (O(k^2) for k symbols) instead of recomputing the window.
+The running sums are rebuilt from the buffer every ``window`` updates to bound drift.
+
+Run ``python correlation.py H1 200`` to benchmark against pandas ``rolling().corr()``.
+"""
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import market
+import panel
+
+CURRENCIES = ['EUR', 'USD', 'JPY', 'GBP', 'CHF', 'AUD', 'CAD']
+DEFAULT_WINDOW = 200
+
+_lock = threading.Lock()
+_engines = {}
+
+
+class RollingCorrelation:
+    """Correlation matrix of the last ``window`` return vectors, updated per bar."""
+
+    def __init__(self, labels, window=DEFAULT_WINDOW):
+        self.labels = list(labels)
+        self.window = window
+        k = len(self.labels)
+        self.buffer = np.zeros((window, k))
+        self.count = 0
+        self.position = 0
+        self.updates = 0
+        self.total = np.zeros(k)
+        self.cross = np.zeros((k, k))
+
+    def update(self, x):
+        """Add one return vector, dropping the oldest one once the window is full."""
+        if self.count == self.window:
+            old = self.buffer[self.position]
+            self.total -= old
+            self.cross -= np.outer(old, old)
+        else:
+            self.count += 1
+        self.buffer[self.position] = x
+        self.total += x
+        self.cross += np.outer(x, x)
+        self.position = (self.position + 1) % self.window
+        self.updates += 1
+        if self.updates % self.window == 0:
+            self._resync()
+
+    def seed(self, rows):
+        """Initialise the state from the last ``window`` rows in one vectorised step."""
+        rows = np.asarray(rows, dtype=np.float64)[-self.window:]
+        self.count = len(rows)
+        self.buffer[:self.count] = rows
+        self.position = self.count % self.window
+        self._resync()
+
+    def _resync(self):
+        rows = self.buffer[:self.count]
+        self.total = rows.sum(axis=0)
+        self.cross = rows.T @ rows
+
+    def covariance(self):
+        n = self.count
+        if n < 2:
+            return np.full(self.cross.shape, np.nan)
+        return (self.cross - np.outer(self.total, self.total) / n) / (n - 1)
+
+    def correlation(self):
+        cov = self.covariance()
+        std = np.sqrt(np.diag(cov))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return cov / np.outer(std, std)
+
+
+def strength_weights(symbols, currencies=CURRENCIES):
+    """Return the (currency x symbol) matrix mapping symbol returns to currency strength.
+
+    A pair's return counts +1 for its base and -1 for its quote currency, the USDX/EURX
+    indices count +1 for their currency, and each row is averaged over its symbols.
+    """
+    weights = np.zeros((len(currencies), len(symbols)))
+    for column, symbol in enumerate(symbols):
+        involved = market.symbol_currencies(symbol)
+        for sign, currency in zip((1.0, -1.0), involved):
+            if currency in currencies:
+                weights[currencies.index(currency), column] = sign
+    counts = np.abs(weights).sum(axis=1, keepdims=True)
+    return np.divide(weights, counts, out=np.zeros_like(weights), where=counts > 0)
+
+
+class RollingStrength:
+    """Currency-strength score: the rolling sum of signed returns per currency, in bps."""
+
+    def __init__(self, symbols, window=DEFAULT_WINDOW, currencies=CURRENCIES):
+        self.currencies = list(currencies)
+        self.weights = strength_weights(symbols, self.currencies)
+        self.window = window
+        self.buffer = np.zeros((window, len(self.currencies)))
+        self.count = 0
+        self.position = 0
+        self.updates = 0
+        self.total = np.zeros(len(self.currencies))
+
+    def update(self, x):
+        contribution = 1e4 * (self.weights @ x)
+        if self.count == self.window:
+            self.total -= self.buffer[self.position]
+        else:
+            self.count += 1
+        self.buffer[self.position] = contribution
+        self.total += contribution
+        self.position = (self.position + 1) % self.window
+        self.updates += 1
+        if self.updates % self.window == 0:
+            self.total = self.buffer[:self.count].sum(axis=0)
+
+    def seed(self, rows):
+        rows = 1e4 * (np.asarray(rows, dtype=np.float64)[-self.window:] @ self.weights.T)
+        self.count = len(rows)
+        self.buffer[:self.count] = rows
+        self.position = self.count % self.window
+        self.total = rows.sum(axis=0)
+
+    def scores(self):
+        return pd.Series(self.total, index=self.currencies)
+
+
+class CorrelationEngine:
+    """Correlation and strength state for one timeframe, fed from the shared panel."""
+
+    def __init__(self, timeframe, window=DEFAULT_WINDOW):
+        self.timeframe = timeframe
+        self.panel = panel.get_panel(timeframe)
+        self.correlation = RollingCorrelation(self.panel.symbols, window)
+        self.strength = RollingStrength(self.panel.symbols, window)
+        # Serialises refreshes so concurrent reruns never feed the same rows twice
+        self._lock = threading.Lock()
+        self._seed()
+
+    def _seed(self):
+        self.rewrites = self.panel.rewrites
+        returns = self._complete_returns(0)
+        self.correlation.seed(returns)
+        self.strength.seed(returns)
+        self.consumed = len(self.panel)
+
+    def _complete_returns(self, start):
+        """Returns from row ``start`` on, skipping rows where any symbol has no price yet."""
+        returns = self.panel.returns(start=start)
+        return returns[~np.isnan(returns).any(axis=1)]
+
+    def refresh(self):
+        """Pull new bars into the panel and feed only those rows to the engines."""
+        with self._lock:
+            panel.update_panel(self.timeframe)
+            if self.panel.rewrites != self.rewrites:
+                # Rows already fed were re-aligned; rebuild the windows from the panel
+                self._seed()
+                return len(self.panel)
+            new_rows = self._complete_returns(self.consumed)
+            for x in new_rows:
+                self.correlation.update(x)
+                self.strength.update(x)
+            self.consumed = len(self.panel)
+            return len(new_rows)
+
+    def matrix(self):
+        return pd.DataFrame(self.correlation.correlation(), index=self.panel.symbols, columns=self.panel.symbols)
+
+
+def get_engine(timeframe, window=DEFAULT_WINDOW):
+    """Return the process-wide engine for (timeframe, window), building it on first use."""
+    with _lock:
+        engine = _engines.get((timeframe, window))
+        if engine is None:
+            engine = _engines[(timeframe, window)] = CorrelationEngine(timeframe, window)
+        return engine
+
+
+def render_heat_map(timeframe, window=DEFAULT_WINDOW):
+    """Show the correlation heat map and currency strength for one timeframe."""
+    import streamlit as st
+    import plotly.graph_objects as go
+
+    engine = get_engine(timeframe, window)
+    engine.refresh()
+    matrix = engine.matrix()
+    fig = go.Figure(go.Heatmap(
+        z=matrix.to_numpy(),
+        x=matrix.columns,
+        y=matrix.index,
+        zmin=-1,
+        zmax=1,
+        colorscale='RdBu',
+        text=matrix.round(2).to_numpy(),
+        texttemplate='%{text}',
+    ))
+    fig.update_layout(title=f'Rolling {window}-bar Correlation ({timeframe})', template='plotly_dark', height=600)
+    st.plotly_chart(fig, use_container_width=True)
+
+    scores = engine.strength.scores().sort_values(ascending=False)
+    fig = go.Figure(go.Bar(
+        x=scores.index,
+        y=scores.to_numpy(),
+        marker_color=['green' if value >= 0 else 'red' for value in scores],
+    ))
+    fig.update_layout(title=f'Currency Strength over {window} bars (bps)', template='plotly_dark', height=400)
+    st.plotly_chart(fig, use_container_width=True)
+
+
+def benchmark(timeframe, window=DEFAULT_WINDOW, new_bars=500):
+    """Compare the incremental engine with pandas ``rolling().corr()``."""
+    price_panel = panel.get_panel(timeframe)
+    returns = price_panel.returns()
+    returns = returns[~np.isnan(returns).any(axis=1)]
+    frame = pd.DataFrame(returns, columns=price_panel.symbols)
+
+    start = time.perf_counter()
+    naive = frame.rolling(window).corr()
+    naive_full = time.perf_counter() - start
+
+    start = time.perf_counter()
+    engine = RollingCorrelation(price_panel.symbols, window)
+    engine.seed(returns[:-new_bars])
+    for x in returns[-new_bars:]:
+        engine.update(x)
+    incremental = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for end in range(len(frame) - new_bars, len(frame)):
+        frame.iloc[end + 1 - window:end + 1].corr()
+    naive_per_bar = time.perf_counter() - start
+
+    last = naive.loc[len(frame) - 1].to_numpy()
+    return {
+        'rows': len(frame),
+        'new_bars': new_bars,
+        'pandas_rolling_corr_s': naive_full,
+        'pandas_window_corr_per_bar_s': naive_per_bar,
+        'incremental_seed_and_updates_s': incremental,
+        'max_abs_diff': float(np.nanmax(np.abs(last - engine.correlation()))),
+    }
+
+
+if __name__ == '__main__':
+    timeframe = sys.argv[1] if len(sys.argv) > 1 else 'H1'
+    window = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_WINDOW
+    for name, value in benchmark(timeframe, window).items():
+        print(f'{name}: {value}')
@@ -0,0 +1,173 @@
+"""As-of join of economic calendar events onto price bars, for event-impact analytics.
+
+Every release in ``celender.csv`` is matched to the bar containing it (the last bar opening
+at or before the release) for each symbol involving the event's currency, using
+``np.searchsorted`` on the bar timestamps. Pre-event moves are measured from the open
+``h`` bars before the event bar, post-event moves from the event bar's open to the close
+``h - 1`` bars later, both in pips. Joined results are cached in memory and on disk under
+FOREX_CACHE_DIR (default ``cache``), keyed on the source files and the parameters; only the
+newest file per (timeframe, horizons) is kept.
+"""
+import hashlib
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+import calendar_features
+import market
+import perf
+
+DEFAULT_HORIZONS = (1, 4, 12)
+CACHE_DIR = os.environ.get('FOREX_CACHE_DIR', 'cache')
+
+_lock = threading.Lock()
+_joined = {}
+
+
+def event_bar_index(bar_times, event_times):
+    """Return the index of the bar containing each event, -1 where no bar contains it.
+
+    An event belongs to the last bar opening at or before it, provided it falls within the
+    usual bar span of that bar; events in data gaps or past the last bar get -1.
+    """
+    index = np.searchsorted(bar_times, event_times, side='right') - 1
+    if len(bar_times) < 2:
+        return np.full(len(event_times), -1)
+    bar_span = np.median(np.diff(bar_times))
+    inside = (index >= 0) & (event_times < bar_times[index.clip(0)] + bar_span)
+    return np.where(inside, index, -1)
+
+
+def event_moves(bar_times, opens, closes, event_times, horizons, pip_size):
+    """Return the bar index and the pre/post-event moves in pips for every event."""
+    index = event_bar_index(bar_times, event_times)
+    found = index >= 0
+    last = len(bar_times) - 1
+    reference = np.where(found, opens[index.clip(0)], np.nan)
+
+    moves = {}
+    for h in horizons:
+        pre = index - h
+        moves[f'Pre_{h}'] = np.where(found & (pre >= 0), (reference - opens[pre.clip(0)]) / pip_size, np.nan)
+        post = index + h - 1
+        moves[f'Post_{h}'] = np.where(found & (post <= last), (closes[post.clip(0, last)] - reference) / pip_size, np.nan)
+    return index, moves
+
+
+def join_symbol(events, bars, symbol, timeframe, horizons):
+    """As-of join ``events`` onto one symbol's bars and attach the moves in pips."""
+    times = market.bar_times(bars)
+    event_times = events['Datetime'].to_numpy(dtype='datetime64[ns]')
+    index, moves = event_moves(
+        times,
+        market.as_float_array(bars, 'open'),
+        market.as_float_array(bars, 'close'),
+        event_times,
+        horizons,
+        market.pip_sizes[symbol],
+    )
+    joined = events[['Currency', 'Event', 'Impact', 'Datetime', 'Consensus', 'Actual']].copy()
+    joined['Surprise'] = joined['Actual'] - joined['Consensus']
+    joined['Symbol'] = symbol
+    joined['Timeframe'] = timeframe
+    joined['Bar_Time'] = times[index.clip(0)]
+    for name, values in moves.items():
+        joined[name] = values
+    return joined[index >= 0]
+
+
+def _source_key(timeframe, horizons):
+    """Hash the parameters and the size/mtime of every source file."""
+    files = [calendar_features.CALENDAR_FILE] + [market.get_dataframe_filename(s, timeframe) for s in market.symbols]
+    parts = [timeframe, ','.join(map(str, horizons))]
+    for filename in files:
+        if os.path.isfile(filename):
+            stat = os.stat(filename)
+            parts.append(f'{filename}:{stat.st_size}:{stat.st_mtime_ns}')
+    return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()[:16]
+
+
+def build_joined(timeframe, horizons=DEFAULT_HORIZONS):
+    """Join every event to every symbol involving its currency on one timeframe."""
+    calendar = calendar_features.load_calendar().dropna(subset=['Datetime'])
+    frames = []
+    for symbol in market.symbols:
+        filename = market.get_dataframe_filename(symbol, timeframe)
+        if not os.path.isfile(filename):
+            continue
+        events = calendar[calendar['Currency'].isin(market.symbol_currencies(symbol))]
+        if events.empty:
+            continue
+        with perf.timed('bars_load', symbol, timeframe):
+            bars = market.load_bars(symbol, timeframe, ('open', 'close'))
+        with perf.timed('event_join', symbol, timeframe):
+            frames.append(join_symbol(events, bars, symbol, timeframe, horizons))
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
+
+
+def _cache_prefix(timeframe, horizons):
+    return f"event_impact_{timeframe}_{'-'.join(map(str, horizons))}_"
+
+
+def _write_cache(path, joined, prefix):
+    """Write ``joined`` atomically to ``path`` and drop the older files sharing ``prefix``."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    # A reader never sees a partly written pickle: it is renamed into place once complete
+    tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        joined.to_pickle(tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    for name in os.listdir(CACHE_DIR):
+        stale = os.path.join(CACHE_DIR, name)
+        if name.startswith(prefix) and name.endswith('.pkl') and stale != path:
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+
+
+def get_joined(timeframe, horizons=DEFAULT_HORIZONS):
+    """Return the joined events for ``timeframe``, from memory, disk or a fresh build."""
+    horizons = tuple(horizons)
+    key = _source_key(timeframe, horizons)
+    with _lock:
+        cached = _joined.get((timeframe, horizons))
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+    prefix = _cache_prefix(timeframe, horizons)
+    path = os.path.join(CACHE_DIR, f'{prefix}{key}.pkl')
+    if os.path.isfile(path):
+        joined = pd.read_pickle(path)
+    else:
+        joined = build_joined(timeframe, horizons)
+        _write_cache(path, joined, prefix)
+
+    with _lock:
+        # Replacing the entry releases the frame built from older source files
+        _joined[(timeframe, horizons)] = (key, joined)
+    return joined
+
+
+def impact_statistics(joined, horizon):
+    """Summarise the post-event move per (Currency, Event, Symbol) for one horizon."""
+    post = f'Post_{horizon}'
+    pre = f'Pre_{horizon}'
+    if joined.empty:
+        return pd.DataFrame()
+    moves = joined.assign(Abs_Post=joined[post].abs(), Abs_Pre=joined[pre].abs())
+    stats = moves.groupby(['Currency', 'Event', 'Symbol'], sort=False).agg(
+        Releases=(post, 'count'),
+        Mean_Post_Pips=(post, 'mean'),
+        Mean_Abs_Post_Pips=('Abs_Post', 'mean'),
+        Std_Post_Pips=(post, 'std'),
+        Mean_Abs_Pre_Pips=('Abs_Pre', 'mean'),
+    )
+    return stats.sort_values('Mean_Abs_Post_Pips', ascending=False).reset_index()
@@ -0,0 +1,134 @@
+"""Per-bar model features and the BUY/SELL rule of the Forex prediction page.
+
+``bar_features`` derives, for every bar, the 20 inputs the Prediction page asks for by
+hand. EMA_5/8/13, MACD_Line and MACD_Signal are taken from the price file when it ships
+them, since the models were trained on those columns. Otherwise they are recomputed from
+the close with recursive (``adjust=False``) exponential averages, so a streaming
+computation can carry their state across chunks and reproduce the in-memory result exactly.
+
+The features of a bar include its close, so a signal is only known once the bar has
+closed: backtests enter at that close and exit at the next bar's close.
+"""
+import numpy as np
+import pandas as pd
+
+import market
+
+FEATURE_NAMES = [
+    'open_price', 'EMA_5', 'EMA_8', 'EMA_13', 'MACD_Signal', 'lag1_close', 'lag2_close',
+    'previous_open', 'previous_high', 'previous_low', 'previous_open2', 'previous_high2',
+    'previous_low2', 'previous_pip_value', 'open_macd_diff', 'prev_EMA_5', 'prev_EMA_8',
+    'prev_EMA_13', 'prev_open_macd_diff', 'prev_MACD_Signal'
+]
+
+EMA_SPANS = (5, 8, 13)
+# Indicator columns shipped in the forex_{symbol}_{timeframe}.csv files
+INDICATOR_COLUMNS = ['EMA_5', 'EMA_8', 'EMA_13', 'MACD_Line', 'MACD_Signal']
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+TRADE_SIZE = 100000  # 1 standard lot
+
+# Added to the model output before comparing it with the open, as on the Prediction page
+SIGNAL_ADJUSTMENT = 0.0265
+
+
+def ema(series, span, seed=None):
+    """Recursive EMA of ``series``; ``seed`` is the EMA value just before its first element."""
+    if seed is None:
+        return series.ewm(span=span, adjust=False).mean()
+    # Starting the recursion from the carried value continues the previous chunk exactly
+    extended = pd.concat([pd.Series([seed], dtype=np.float64), series.reset_index(drop=True)], ignore_index=True)
+    return pd.Series(extended.ewm(span=span, adjust=False).mean().to_numpy()[1:], index=series.index)
+
+
+def indicators(close, state=None):
+    """Return EMA_5/8/13, the MACD EMAs, MACD_Line and MACD_Signal for a close series.
+
+    ``state`` is the last indicator row of the preceding data, if any.
+    """
+    def seed(name):
+        return None if state is None else state[name]
+
+    out = pd.DataFrame(index=close.index)
+    for span in EMA_SPANS:
+        out[f'EMA_{span}'] = ema(close, span, seed(f'EMA_{span}'))
+    out[f'EMA_{MACD_FAST}'] = ema(close, MACD_FAST, seed(f'EMA_{MACD_FAST}'))
+    out[f'EMA_{MACD_SLOW}'] = ema(close, MACD_SLOW, seed(f'EMA_{MACD_SLOW}'))
+    out['MACD_Line'] = out[f'EMA_{MACD_FAST}'] - out[f'EMA_{MACD_SLOW}']
+    out['MACD_Signal'] = ema(out['MACD_Line'], MACD_SIGNAL, seed('MACD_Signal'))
+    return out
+
+
+def shipped_indicators(columns):
+    """Return INDICATOR_COLUMNS when ``columns`` include all of them, otherwise []."""
+    return list(INDICATOR_COLUMNS) if set(INDICATOR_COLUMNS).issubset(columns) else []
+
+
+def load_history(symbol, timeframe):
+    """Load the OHLC bars of one symbol plus the indicator columns its file ships, if any."""
+    columns = pd.read_csv(market.get_dataframe_filename(symbol, timeframe), nrows=0).columns
+    return market.load_bars(symbol, timeframe, ('open', 'high', 'low', 'close', *shipped_indicators(columns)))
+
+
+def features_from_indicators(bars, ind, pip_size):
+    """Assemble the model features of ``bars`` given their indicator columns.
+
+    The first two bars lack lagged values and come out with NaN features.
+    """
+    prev = bars.shift(1)
+    prev2 = bars.shift(2)
+    prev_ind = ind.shift(1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        previous_pip_value = (pip_size / prev['close']) * TRADE_SIZE
+    return pd.DataFrame({
+        'open_price': bars['open'],
+        'EMA_5': ind['EMA_5'],
+        'EMA_8': ind['EMA_8'],
+        'EMA_13': ind['EMA_13'],
+        'MACD_Signal': ind['MACD_Signal'],
+        'lag1_close': prev['close'],
+        'lag2_close': prev2['close'],
+        'previous_open': prev['open'],
+        'previous_high': prev['high'],
+        'previous_low': prev['low'],
+        'previous_open2': prev2['open'],
+        'previous_high2': prev2['high'],
+        'previous_low2': prev2['low'],
+        'previous_pip_value': previous_pip_value.replace([np.inf, -np.inf], np.nan),
+        'open_macd_diff': bars['open'] - ind['MACD_Line'],
+        'prev_EMA_5': prev_ind['EMA_5'],
+        'prev_EMA_8': prev_ind['EMA_8'],
+        'prev_EMA_13': prev_ind['EMA_13'],
+        'prev_open_macd_diff': prev['open'] - prev_ind['MACD_Line'],
+        'prev_MACD_Signal': prev_ind['MACD_Signal'],
+    }, index=bars.index)[FEATURE_NAMES]
+
+
+def bar_features(bars, pip_size):
+    """Return the model features of every bar of an OHLC frame.
+
+    The frame's own indicator columns are used when it has them all.
+    """
+    shipped = shipped_indicators(bars.columns)
+    ind = bars[shipped] if shipped else indicators(bars['close'])
+    return features_from_indicators(bars, ind, pip_size)
+
+
+def signals(prediction, open_price):
+    """Return +1 (BUY), -1 (SELL) or 0 (HOLD) per bar from the model output."""
+    return np.sign(np.asarray(prediction) + SIGNAL_ADJUSTMENT - np.asarray(open_price))
+
+
+def next_close_moves(bars, pip_size):
+    """Pips from each bar's close to the next bar's close; NaN for the last bar."""
+    close = bars['close'].to_numpy(dtype=np.float64)
+    moves = np.full(len(close), np.nan)
+    moves[:-1] = np.diff(close) / pip_size
+    return moves
+
+
+def strategy_returns(open_price, prediction, moves):
+    """Pips earned by trading each bar's signal from its close to the next bar's close.
+
+    ``moves`` comes from ``next_close_moves`` for the same bars.
+    """
+    return signals(prediction, open_price) * np.asarray(moves)
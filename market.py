@@ -0,0 +1,70 @@
+"""Symbols, timeframes and price-bar loading shared by the pages and the analytics modules."""
+import numpy as np
+import pandas as pd
+
+# Define the list of symbols and timeframes
+symbols = ['USDX', 'EURX', 'XAUUSD', 'EURUSD', 'AUDUSD', 'GBPUSD', 'USDJPY', 'USDCHF', 'USDCAD']
+timeframes = ['M30', 'H1', 'H4', 'D1']
+pip_sizes = {
+    'USDX': 0.0001,
+    'EURX': 0.0001,
+    'XAUUSD': 0.0001,
+    'EURUSD': 0.0001,
+    'AUDUSD': 0.0001,
+    'GBPUSD': 0.0001,
+    'USDJPY': 0.01,    # Specific pip size for USDJPY
+    'USDCHF': 0.0001,
+    'USDCAD': 0.0001
+}
+
+# Candidate names of the bar timestamp column in the forex_{symbol}_{timeframe}.csv files
+TIME_COLUMNS = ('time', 'Time', 'datetime', 'Datetime', 'date', 'Date')
+
+
+def get_dataframe_filename(symbol, timeframe):
+    """Generate the dataframe filename based on the symbol and timeframe."""
+    return f'forex_{symbol}_{timeframe}.csv'
+
+
+def get_model_filename(symbol, timeframe):
+    """Generate the model filename based on the symbol and timeframe."""
+    return f'{symbol}_{timeframe}.pkl'
+
+
+def symbol_currencies(symbol):
+    """Return the currencies a symbol involves, e.g. EURUSD -> EUR, USD and USDX -> USD."""
+    if len(symbol) == 6:
+        return [symbol[:3], symbol[3:]]
+    return [symbol[:3]]
+
+
+def find_time_column(columns):
+    """Return the name of the timestamp column among ``columns``."""
+    for name in TIME_COLUMNS:
+        if name in columns:
+            return name
+    raise ValueError(f"No timestamp column found, expected one of {TIME_COLUMNS}")
+
+
+def load_bars(symbol, timeframe, fields=('open', 'high', 'low', 'close')):
+    """Load the timestamp and the requested price fields of one symbol, sorted by time.
+
+    Only the needed columns are parsed, which keeps loading all nine symbols cheap.
+    """
+    filename = get_dataframe_filename(symbol, timeframe)
+    header = pd.read_csv(filename, nrows=0).columns
+    time_column = find_time_column(header)
+    bars = pd.read_csv(filename, usecols=[time_column, *fields])
+    bars['time'] = pd.to_datetime(bars.pop(time_column))
+    bars = bars.sort_values('time', kind='stable').reset_index(drop=True)
+    return bars[['time', *fields]]
+
+
+def bar_times(bars):
+    """Return the bar timestamps as a datetime64[ns] array."""
+    return bars['time'].to_numpy(dtype='datetime64[ns]')
+
+
+def as_float_array(bars, field):
+    """Return one price field as a contiguous float64 array."""
+    return np.ascontiguousarray(bars[field].to_numpy(dtype=np.float64))
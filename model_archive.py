@@ -0,0 +1,252 @@
+"""Single-file model archive with an offset index and memory-mapped loading.
+
+``pack`` bundles the ``{symbol}_{timeframe}.pkl`` and ``{currency}.pkl`` models into one
+file laid out as::
+
+    MAGIC | manifest length (8 bytes, little endian) | manifest JSON | aligned payloads
+
+Each model is pickled with protocol 5; numpy buffers of at least MMAP_THRESHOLD bytes are
+stored out-of-band, 64-byte aligned, after the pickle. The manifest records the offsets,
+a SHA-256 of every payload and the scikit-learn version. ``ModelArchive`` maps the file
+read-only once and unpickles a model with its arrays as zero-copy views of the mapping, so
+processes loading the same archive share those pages and any model loads in constant time.
+
+Re-pickling a model does not make it valid for the installed scikit-learn, so ``pack``
+refuses models trained with another version unless forced, and loading such a forced model
+emits scikit-learn's ``InconsistentVersionWarning``.
+
+Usage: ``python model_archive.py pack [--force] [models.pack]`` or
+``python model_archive.py list``.
+"""
+import hashlib
+import json
+import mmap
+import os
+import pickle
+import struct
+import sys
+import threading
+import warnings
+
+MAGIC = b'FXMODELS1\n'
+ALIGNMENT = 64
+MMAP_THRESHOLD = 4096
+ARCHIVE_FILE = os.environ.get('FOREX_MODEL_ARCHIVE', 'models.pack')
+
+
+def _sklearn_version():
+    import sklearn
+    return sklearn.__version__
+
+
+def _pad(offset):
+    return -offset % ALIGNMENT
+
+
+def default_model_files():
+    """Return the model files the pages load: one per (symbol, timeframe) and per currency."""
+    import calendar_features
+    import market
+
+    files = [market.get_model_filename(symbol, timeframe) for symbol in market.symbols for timeframe in market.timeframes]
+    files += [calendar_features.get_model_filename(currency) for currency in calendar_features.CURRENCIES]
+    return [filename for filename in files if os.path.isfile(filename)]
+
+
+def load_pickle(filename):
+    """Load a model pickle, returning the model and the scikit-learn version it was saved with.
+
+    The version mismatch warning is turned into the returned version; any other warning
+    is passed on.
+    """
+    import joblib
+    from sklearn.exceptions import InconsistentVersionWarning
+
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always', InconsistentVersionWarning)
+        model = joblib.load(filename)
+    for warning in caught:
+        if issubclass(warning.category, InconsistentVersionWarning):
+            return model, warning.message.original_sklearn_version
+        warnings.showwarning(warning.message, warning.category, warning.filename, warning.lineno)
+    return model, _sklearn_version()
+
+
+def _serialize(model):
+    """Pickle ``model``, moving large contiguous buffers out of band."""
+    buffers = []
+
+    def keep_in_band(buffer):
+        if buffer.raw().nbytes < MMAP_THRESHOLD:
+            return True
+        buffers.append(buffer)
+        return False
+
+    payload = pickle.dumps(model, protocol=5, buffer_callback=keep_in_band)
+    return payload, [buffer.raw() for buffer in buffers]
+
+
+def pack(filenames=None, output=ARCHIVE_FILE, force=False):
+    """Write the models in ``filenames`` to one archive and return its manifest.
+
+    Raises ValueError if a model was trained with a scikit-learn version other than the
+    installed one, unless ``force`` is set.
+    """
+    filenames = default_model_files() if filenames is None else filenames
+    sklearn_version = _sklearn_version()
+    models = [(filename, *load_pickle(filename)) for filename in filenames]
+    mismatched = [f'{filename} ({version})' for filename, _, version in models if version != sklearn_version]
+    if mismatched and not force:
+        raise ValueError(
+            f"Models trained with another scikit-learn version than {sklearn_version}: "
+            f"{', '.join(mismatched)}; retrain them, or pack them anyway with force=True (--force)"
+        )
+
+    entries = {}
+    blobs = []
+    offset = 0
+    for filename, model, trained_version in models:
+        payload, buffers = _serialize(model)
+        digest = hashlib.sha256(payload)
+        chunks = []
+        for data in [payload] + buffers:
+            offset += _pad(offset)
+            chunks.append([offset, data.nbytes if isinstance(data, memoryview) else len(data)])
+            blobs.append((offset, data))
+            offset += chunks[-1][1]
+        for data in buffers:
+            digest.update(data)
+        name = os.path.splitext(os.path.basename(filename))[0]
+        entries[name] = {
+            'pickle': chunks[0],
+            'buffers': chunks[1:],
+            'sha256': digest.hexdigest(),
+            'trained_sklearn_version': trained_version,
+        }
+
+    manifest = {'sklearn_version': sklearn_version, 'alignment': ALIGNMENT, 'models': entries}
+    header = json.dumps(manifest, sort_keys=True).encode('utf-8')
+    start = len(MAGIC) + 8 + len(header)
+    start += _pad(start)
+
+    tmp = output + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', len(header)))
+        f.write(header)
+        f.write(b'\0' * (start - f.tell()))
+        for relative, data in blobs:
+            f.write(b'\0' * (start + relative - f.tell()))
+            f.write(data)
+    os.replace(tmp, output)
+    return manifest
+
+
+class ModelArchive:
+    """Read-only, memory-mapped view of a packed model archive."""
+
+    def __init__(self, path=ARCHIVE_FILE, check_version=True):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            stat = os.fstat(f.fileno())
+        # Size and mtime of the file this view maps, to notice when it is repacked
+        self.stamp = stat.st_size, stat.st_mtime_ns
+        if self._map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a model archive")
+        (length,) = struct.unpack_from('<Q', self._map, len(MAGIC))
+        header_end = len(MAGIC) + 8 + length
+        self.manifest = json.loads(self._map[len(MAGIC) + 8:header_end])
+        self._start = header_end + _pad(header_end)
+        self._view = memoryview(self._map)
+        self._models = {}
+        self._lock = threading.Lock()
+
+        installed = _sklearn_version()
+        if check_version and self.manifest['sklearn_version'] != installed:
+            raise ValueError(
+                f"{path} was packed with scikit-learn {self.manifest['sklearn_version']} "
+                f"but {installed} is installed; repack the models with this version"
+            )
+
+    def __contains__(self, name):
+        return name in self.manifest['models']
+
+    def names(self):
+        return sorted(self.manifest['models'])
+
+    def _slice(self, chunk):
+        offset, length = chunk
+        return self._view[self._start + offset:self._start + offset + length]
+
+    def load(self, name, verify=True):
+        """Return the model ``name``; large arrays are read-only views of the mapping.
+
+        With ``verify`` the payload hash is checked the first time a model is loaded.
+        """
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        entry = self.manifest['models'][name]
+        payload = self._slice(entry['pickle'])
+        buffers = [self._slice(chunk) for chunk in entry['buffers']]
+        if verify:
+            digest = hashlib.sha256(payload)
+            for buffer in buffers:
+                digest.update(buffer)
+            if digest.hexdigest() != entry['sha256']:
+                raise ValueError(f"Model {name} is corrupted: content hash mismatch")
+        trained_version = entry['trained_sklearn_version']
+        if trained_version != self.manifest['sklearn_version']:
+            from sklearn.exceptions import InconsistentVersionWarning
+
+            warnings.warn(InconsistentVersionWarning(
+                estimator_name=name,
+                current_sklearn_version=self.manifest['sklearn_version'],
+                original_sklearn_version=trained_version,
+            ), stacklevel=2)
+        model = pickle.loads(payload, buffers=buffers)
+        with self._lock:
+            return self._models.setdefault(name, model)
+
+
+_archive = None
+_archive_lock = threading.Lock()
+
+
+def get_archive():
+    """Return the process-wide archive, or None when no archive file exists.
+
+    The archive is reopened when the file's size or mtime changes.
+    """
+    global _archive
+    with _archive_lock:
+        try:
+            stat = os.stat(ARCHIVE_FILE)
+        except OSError:
+            _archive = None
+            return None
+        if _archive is None or _archive.stamp != (stat.st_size, stat.st_mtime_ns):
+            _archive = ModelArchive(ARCHIVE_FILE)
+        return _archive
+
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else 'list'
+    if command == 'pack':
+        args = [arg for arg in sys.argv[2:] if arg != '--force']
+        output = args[0] if args else ARCHIVE_FILE
+        try:
+            manifest = pack(output=output, force='--force' in sys.argv[2:])
+        except ValueError as e:
+            sys.exit(str(e))
+        print(f"Packed {len(manifest['models'])} models into {output} (scikit-learn {manifest['sklearn_version']})")
+        for name, entry in sorted(manifest['models'].items()):
+            if entry['trained_sklearn_version'] != manifest['sklearn_version']:
+                print(f"  {name}: forced, trained with scikit-learn {entry['trained_sklearn_version']}")
+    else:
+        archive = ModelArchive(sys.argv[2] if len(sys.argv) > 2 else ARCHIVE_FILE, check_version=False)
+        print(f"scikit-learn {archive.manifest['sklearn_version']}")
+        for name in archive.names():
+            entry = archive.manifest['models'][name]
+            size = entry['pickle'][1] + sum(length for _, length in entry['buffers'])
+            print(f"  {name}: {size} bytes, {len(entry['buffers'])} mapped buffers, sha256 {entry['sha256'][:12]}")
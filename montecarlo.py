@@ -0,0 +1,128 @@
+"""Monte Carlo simulation of the model-driven BUY/SELL rule.
+
+The model is run once over the whole history of a (symbol, timeframe) to get the per-bar
+pips earned by the Prediction page's rule, entered at a bar's close and exited at the next
+close. Those returns are then resampled with a moving block bootstrap, which keeps
+short-range autocorrelation, into many equity paths. Paths are generated in chunks sized
+from a byte budget (FOREX_MC_CHUNK_MB, default 128 MiB per process), so peak memory stays
+bounded whatever the horizon; every chunk has an independent random stream. The chunks run
+in the calling process unless ``workers`` asks for a pool of spawned (never forked)
+processes, which is only worth it for batch runs outside the threaded Streamlit server.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import features
+import market
+import perf
+import startup
+
+DEFAULT_PATHS = 100_000
+DEFAULT_HORIZON = 500
+DEFAULT_BLOCK = 20
+CHUNK_BYTES = int(os.environ.get('FOREX_MC_CHUNK_MB', '128')) * 1024 ** 2
+
+# Float arrays of shape (paths, horizon) alive at once in simulate_chunk, with some headroom
+_ARRAYS_PER_CHUNK = 4
+
+PERCENTILES = (1, 5, 25, 50, 75, 95, 99)
+
+_worker_returns = None
+
+
+def _init_worker(returns):
+    """Hand the returns to a worker process once instead of with every chunk."""
+    global _worker_returns
+    _worker_returns = returns
+
+
+def _simulate_in_worker(paths, horizon, block, seed):
+    return simulate_chunk(_worker_returns, paths, horizon, block, seed)
+
+
+def historical_returns(symbol, timeframe):
+    """Per-bar strategy returns in pips for the whole history of one symbol."""
+    bars = features.load_history(symbol, timeframe)
+    pip_size = market.pip_sizes[symbol]
+    inputs = features.bar_features(bars, pip_size)
+    moves = features.next_close_moves(bars, pip_size)
+    usable = inputs.notna().all(axis=1).to_numpy() & ~np.isnan(moves)
+    if not usable.any():
+        raise ValueError(f"No {symbol} {timeframe} bars with complete features to backtest")
+    model = startup.load_model(market.get_model_filename(symbol, timeframe))
+    with perf.timed('predict_batch', symbol, timeframe):
+        prediction = model.predict(inputs[usable].to_numpy())
+    return features.strategy_returns(bars['open'].to_numpy()[usable], prediction, moves[usable])
+
+
+def bootstrap_indices(rng, n, paths, horizon, block):
+    """Draw moving-block bootstrap indices of shape (paths, horizon) into a series of length n."""
+    block = min(block, n)
+    blocks = -(-horizon // block)
+    starts = rng.integers(0, n - block + 1, size=(paths, blocks))
+    index = starts[:, :, None] + np.arange(block)
+    return index.reshape(paths, blocks * block)[:, :horizon]
+
+
+def simulate_chunk(returns, paths, horizon, block, seed):
+    """Simulate ``paths`` equity paths; return their final PnL and maximum drawdown."""
+    rng = np.random.default_rng(seed)
+    equity = np.cumsum(returns[bootstrap_indices(rng, len(returns), paths, horizon, block)], axis=1)
+    peak = np.maximum.accumulate(np.maximum(equity, 0.0), axis=1)
+    # Copy the last column: a view would keep the whole equity block alive after return
+    return equity[:, -1].copy(), (peak - equity).max(axis=1)
+
+
+def paths_per_chunk(horizon, budget=CHUNK_BYTES):
+    """Return how many paths of ``horizon`` bars one chunk may hold within ``budget`` bytes."""
+    return max(1, budget // (horizon * 8 * _ARRAYS_PER_CHUNK))
+
+
+def simulate(returns, paths=DEFAULT_PATHS, horizon=DEFAULT_HORIZON, block=DEFAULT_BLOCK,
+             chunk_size=None, workers=1, seed=None):
+    """Simulate ``paths`` bootstrapped paths in chunks, across ``workers`` processes.
+
+    Returns the final PnL and maximum drawdown (both in pips) of every path. Without a
+    ``chunk_size`` the paths per chunk come from ``paths_per_chunk(horizon)``. With the
+    default ``workers=1`` everything runs in the calling process.
+    """
+    returns = np.ascontiguousarray(returns, dtype=np.float64)
+    if len(returns) == 0:
+        raise ValueError("No historical returns to bootstrap")
+    chunk_size = chunk_size or paths_per_chunk(horizon)
+    sizes = [min(chunk_size, paths - start) for start in range(0, paths, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    if workers <= 1 or len(sizes) == 1:
+        results = [simulate_chunk(returns, size, horizon, block, s) for size, s in zip(sizes, seeds)]
+    else:
+        # Forking a multi-threaded process can deadlock in the child, so workers are spawned
+        with ProcessPoolExecutor(max_workers=min(workers, len(sizes)), mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_worker, initargs=(returns,)) as pool:
+            results = list(pool.map(
+                _simulate_in_worker, sizes, [horizon] * len(sizes), [block] * len(sizes), seeds,
+            ))
+    pnl = np.concatenate([r[0] for r in results])
+    drawdown = np.concatenate([r[1] for r in results])
+    return pnl, drawdown
+
+
+def summarize(pnl, drawdown):
+    """Percentiles of PnL and drawdown plus loss probability and expected shortfall."""
+    table = pd.DataFrame({
+        'PnL_Pips': np.percentile(pnl, PERCENTILES),
+        'Max_Drawdown_Pips': np.percentile(drawdown, PERCENTILES),
+    }, index=[f'P{p}' for p in PERCENTILES])
+    tail = pnl[pnl <= np.percentile(pnl, 5)]
+    stats = {
+        'paths': len(pnl),
+        'mean_pnl': pnl.mean(),
+        'probability_of_loss': (pnl < 0).mean(),
+        'expected_shortfall_5pct': tail.mean(),
+        'mean_max_drawdown': drawdown.mean(),
+    }
+    return table, stats
@@ -1,11 +1,13 @@
 import streamlit as st
-import joblib
 import pandas as pd
 import os
-import warnings
-from sklearn.exceptions import InconsistentVersionWarning
-
-warnings.filterwarnings(action='ignore', category=InconsistentVersionWarning)
+import perf
+import profiling
+import startup
+import calendar_features
+import calendar_store
+import event_impact
+import market
 
 # Set page configuration
 st.set_page_config(
@@ -14,22 +16,25 @@ st.set_page_config(
     layout="wide"
 )
 
-def get_model_filename(currency):
-    return f'{currency}.pkl'
-
-def get_dataframe_filename(currency):
-    return f'{currency}_event.csv'
-
 def load_currency_data(currency):
-    filename = get_dataframe_filename(currency)
+    filename = calendar_features.get_encoder_filename(currency)
     if not os.path.isfile(filename):
         st.error(f"Data file {filename} not found.")
         return pd.DataFrame()  # Return an empty DataFrame if file is not found
-    return pd.read_csv(filename)
+    return startup.load_csv(filename, currency)
+
+def show_paged(df, key, page_size=100):
+    """Display one page of a frame so large tables are not sent to the browser whole."""
+    pages = calendar_store.page_count(len(df), page_size)
+    page_number = st.number_input(f'Page (1-{pages}, {len(df)} rows)', min_value=1, max_value=pages, value=1, step=1, key=key)
+    rows, _ = calendar_store.page(df, page_size, page_number)
+    st.dataframe(rows)
 
 def main():
+    perf.serve_metrics()
+
     # Create a sidebar with navigation options
-    page = st.sidebar.radio("Navigation", ["About", "Prediction"])
+    page = st.sidebar.radio("Navigation", ["About", "Prediction", "Batch Prediction", "Calendar", "Event Impact"])
 
     if page == "About":
         # Title and image centered
@@ -90,25 +95,26 @@ def main():
         st.markdown("---")
 
     elif page == "Prediction":
-        impact = pd.read_csv("impact.csv")
+        impact = startup.load_csv("impact.csv", 'impact')
         st.sidebar.subheader("Impact Data")
         st.sidebar.dataframe(impact)
         
         # Sidebar for currency selection
         currency = st.sidebar.radio(
             "Select Currency",
-            ['EUR', 'USD', 'GBP', 'CHF', 'NZD', 'CAD', 'AUD', 'JPY']
+            calendar_features.CURRENCIES
         )
+        profiling.tag(symbol=currency)
 
         st.title(f'Model Prediction For {currency}')
         
         # Load the model for the selected currency
-        model_filename = get_model_filename(currency)
-        if not os.path.isfile(model_filename):
+        model_filename = calendar_features.get_model_filename(currency)
+        if not startup.model_exists(model_filename):
             st.error(f"Model file {model_filename} not found.")
             return
         
-        model = joblib.load(model_filename)
+        model = startup.load_model(model_filename, currency)
         
         # Load the DataFrame for the selected currency
         df = load_currency_data(currency)
@@ -120,7 +126,7 @@ def main():
         st.sidebar.write(f"Selected Currency: {currency}")
         st.sidebar.write(f"Model File: {model_filename}")
         st.write("Encoder Data")
-        st.dataframe(df)
+        show_paged(df, key='encoder_page')
 
         # Input fields for each feature
         # Additional Prediction Inputs with high precision and descriptive labels
@@ -147,8 +153,105 @@ def main():
         # Button to make predictions
         if st.button('Predict'):
             # Make predictions with the selected model
-            prediction = model.predict(data)
+            with perf.timed('predict', currency):
+                prediction = model.predict(data)
             st.write(f'Prediction: {prediction[0]}')
 
+        perf.render_panel()
+        profiling.render_panel()
+
+    elif page == "Batch Prediction":
+        st.title('Batch Prediction Over The Event History')
+
+        # Sidebar for currency selection
+        currencies = st.sidebar.multiselect(
+            "Select Currencies",
+            calendar_features.CURRENCIES,
+            default=calendar_features.CURRENCIES
+        )
+        if not currencies:
+            st.warning("Select at least one currency.")
+            return
+
+        # Derive the features for every release and score each currency in one batch;
+        # the result is reused across reruns until a source file changes
+        with perf.timed('score_calendar', 'batch'):
+            scored = calendar_features.get_scored(currencies)
+        if not scored:
+            st.error("No model or encoder files found for the selected currencies.")
+            return
+
+        st.subheader('Predicted vs Actual Surprise')
+        st.dataframe(calendar_features.surprise_summary(scored))
+
+        # Per-currency detail tables
+        columns = ['Datetime', 'Event', 'Impact'] + calendar_features.FEATURES + [
+            'Actual', 'Prediction', 'Actual_Surprise', 'Predicted_Surprise'
+        ]
+        for currency, features in scored.items():
+            with st.expander(f'{currency} ({len(features)} events)'):
+                show_paged(features[columns], key=f'batch_page_{currency}')
+
+        perf.render_panel()
+        profiling.render_panel()
+
+    elif page == "Calendar":
+        st.title('Economic Calendar')
+        st.caption(f'Release times are in {calendar_features.CALENDAR_TZ}.')
+        with perf.timed('calendar_store', 'calendar'):
+            store = calendar_store.get_store()
+
+        # Sidebar for currency and query selection
+        currency = st.sidebar.selectbox("Select Currency", ['All'] + calendar_features.CURRENCIES)
+        currency = None if currency == 'All' else currency
+        query = st.sidebar.radio("Query", ["Upcoming Events", "Event History", "Events In Window"])
+
+        if query == "Upcoming Events":
+            k = st.sidebar.number_input('Number of events', min_value=1, max_value=500, value=20, step=1)
+            # Release times are naive in the calendar's timezone, so "now" must be too
+            events = store.next_events(k, calendar_features.calendar_now(), currency)
+        elif query == "Event History":
+            if currency is None:
+                st.warning("Select a currency to browse its event history.")
+                return
+            event = st.sidebar.selectbox("Select Event", store.events(currency))
+            events = store.event_history(currency, event)
+        else:
+            today = calendar_features.calendar_now().normalize()
+            start = st.sidebar.date_input('From', value=today - pd.Timedelta(days=7))
+            end = st.sidebar.date_input('To', value=today)
+            events = store.events_between(start, pd.Timestamp(end) + pd.Timedelta(days=1), currency)
+
+        show_paged(events, key='calendar_page')
+
+        perf.render_panel()
+        profiling.render_panel()
+
+    elif page == "Event Impact":
+        st.title('Event Impact On Price')
+
+        # Sidebar for timeframe, horizon and currency selection
+        timeframe = st.sidebar.radio('Select Timeframe', market.timeframes, index=1)
+        horizon = st.sidebar.radio('Horizon (bars)', event_impact.DEFAULT_HORIZONS)
+        currency = st.sidebar.selectbox("Select Currency", ['All'] + calendar_features.CURRENCIES)
+
+        with perf.timed('event_impact', timeframe=timeframe):
+            joined = event_impact.get_joined(timeframe)
+        if joined.empty:
+            st.error(f"No price data found for {timeframe}.")
+            return
+        stats = event_impact.impact_statistics(joined, horizon)
+        if currency != 'All':
+            stats = stats[stats['Currency'] == currency]
+
+        st.write(f"Moves in pips from the open of the bar containing each release, over {horizon} bar(s) on {timeframe}.")
+        show_paged(stats, key='impact_page')
+
+        perf.render_panel()
+        profiling.render_panel()
+
+    startup.start_warmup()
+
 if __name__ == '__main__':
-    main()
+    with profiling.profile_rerun('Celender'):
+        main()
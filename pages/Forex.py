@@ -1,37 +1,20 @@
 import streamlit as st
 import numpy as np
-import joblib
 import pandas as pd
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-# Set the page configuration
-import warnings
-from sklearn.exceptions import InconsistentVersionWarning
-from PIL import Image
-
-warnings.filterwarnings(action='ignore', category=InconsistentVersionWarning)
+import perf
+import profiling
+import startup
+import features
+from market import symbols, timeframes, pip_sizes, get_dataframe_filename, get_model_filename
 
+# Set the page configuration
 st.set_page_config(
     page_title="Forex Market Analysis",
     page_icon="💹",
     layout="wide"
 )
 
-# Define the list of symbols and timeframes
-symbols = ['USDX', 'EURX', 'XAUUSD', 'EURUSD', 'AUDUSD', 'GBPUSD', 'USDJPY', 'USDCHF', 'USDCAD']
-timeframes = ['M30', 'H1', 'H4', 'D1']
-pip_sizes = {
-            'USDX': 0.0001,
-            'EURX': 0.0001,
-            'XAUUSD': 0.0001,
-            'EURUSD': 0.0001,
-            'AUDUSD': 0.0001,
-            'GBPUSD': 0.0001,
-            'USDJPY': 0.01,    # Specific pip size for USDJPY
-            'USDCHF': 0.0001,
-            'USDCAD': 0.0001
-        }
-        # Function to calculate pip value based on a single input value
+# Function to calculate pip value based on a single input value
 def calculate_pip_value(exchange_rate, pip_size, trade_size):
     """Calculate the pip value based on a single exchange rate."""
     if exchange_rate == 0:
@@ -65,21 +48,17 @@ def preprocess_features(data, features):
         raise ValueError(f"Missing features for preprocessing: {missing_features}")
     
     return data[numeric_features]
-def get_model_filename(symbol, timeframe):
-    """Generate the model filename based on the symbol and timeframe."""
-    return f'{symbol}_{timeframe}.pkl'
-
-def get_dataframe_filename(symbol, timeframe):
-    """Generate the dataframe filename based on the symbol and timeframe."""
-    return f'forex_{symbol}_{timeframe}.csv'
 
 def load_currency_data(symbol, timeframe):
     """Load the CSV file for the selected symbol and timeframe."""
     filename = get_dataframe_filename(symbol, timeframe)
-    return pd.read_csv(filename)
+    return startup.load_csv(filename, symbol, timeframe)
 
 def plot_forex_data(df, symbol, timeframe):
     """Plot the Forex data with indicators for the selected symbol and timeframe."""
+    go = startup.lazy_import('plotly.graph_objects')
+    make_subplots = startup.lazy_import('plotly.subplots').make_subplots
+
     sample = df.tail(500).copy()
     
     # Calculate Fibonacci retracement levels
@@ -98,28 +77,29 @@ def plot_forex_data(df, symbol, timeframe):
         sample[level] = value
 
     # Create the figure with subplots
-    fig = make_subplots(
-        rows=6, cols=1,
-        shared_xaxes=True,
-        vertical_spacing=0.05,
-        row_heights=[0.4, 0.15, 0.15, 0.15, 0.15, 0.1],
-        subplot_titles=(
-            'Candlestick Chart with Moving Averages and EMAs',
-            'MACD',
-            'RSI',
-            'ATR',
-            'Volume',
-            ''  # Empty subplot for spacing
-        ),
-        specs=[
-            [{}],  # Candlestick chart
-            [{}],  # MACD
-            [{}],  # RSI
-            [{}],  # ATR
-            [{}],  # Volume
-            [{'type': 'domain'}]  # Empty domain to adjust spacing
-        ]
-    )
+    with perf.timed('make_subplots', symbol, timeframe):
+        fig = make_subplots(
+            rows=6, cols=1,
+            shared_xaxes=True,
+            vertical_spacing=0.05,
+            row_heights=[0.4, 0.15, 0.15, 0.15, 0.15, 0.1],
+            subplot_titles=(
+                'Candlestick Chart with Moving Averages and EMAs',
+                'MACD',
+                'RSI',
+                'ATR',
+                'Volume',
+                ''  # Empty subplot for spacing
+            ),
+            specs=[
+                [{}],  # Candlestick chart
+                [{}],  # MACD
+                [{}],  # RSI
+                [{}],  # ATR
+                [{}],  # Volume
+                [{'type': 'domain'}]  # Empty domain to adjust spacing
+            ]
+        )
 
     # Add Candlestick chart with Moving Averages and EMAs to the first subplot
     fig.add_trace(go.Candlestick(
@@ -247,9 +227,11 @@ def plot_forex_data(df, symbol, timeframe):
     return fig
 
 def main():
+    perf.serve_metrics()
+
     # Sidebar navigation
     st.sidebar.title("Navigation")
-    page = st.sidebar.radio("Go to", ["About", "Prediction"])
+    page = st.sidebar.radio("Go to", ["About", "Prediction", "Portfolio Risk", "Monte Carlo"])
 
     if page == "About":
 
@@ -393,7 +375,8 @@ def main():
             data_preprocessed = data_preprocessed.values  # Convert to NumPy array
 
             # Make the prediction
-            prediction = model.predict(data_preprocessed)
+            with perf.timed('predict', symbol, timeframe):
+                prediction = model.predict(data_preprocessed)
 
             return prediction
 
@@ -403,6 +386,7 @@ def main():
         # Select Symbol and Timeframe
         symbol = st.sidebar.radio('Select Symbol', symbols)
         timeframe = st.sidebar.radio('Select Timeframe', timeframes)
+        profiling.tag(symbol=symbol, timeframe=timeframe)
 
         # Display the title with selected symbol and timeframe
         st.title(f"Prediction For {symbol} On {timeframe}📈")
@@ -413,12 +397,13 @@ def main():
 
         # Load the model
         model_filename = get_model_filename(symbol, timeframe)
-        model = joblib.load(model_filename)
+        model = startup.load_model(model_filename, symbol, timeframe)
 
         # Load and plot the latest data for the selected symbol
         df = load_currency_data(symbol, timeframe)
         fig = plot_forex_data(df, symbol, timeframe)
-        st.plotly_chart(fig)
+        with perf.timed('render_chart', symbol, timeframe):
+            st.plotly_chart(fig)
 
         # Prediction Inputs
         st.subheader('Enter Feature Values')
@@ -510,12 +495,13 @@ def main():
             # Make prediction using the make_prediction function
             try:
                 prediction = make_prediction(model, feature_names, input_values)
-                adjustment = 0.0265
+                adjustment = features.SIGNAL_ADJUSTMENT
                 adjusted_prediction = prediction[0] + adjustment
 
                 # Display the prediction value
                 st.markdown(f""" # Original Prediction :  {prediction[0]:.10f}\n""")
 
+                Image = startup.lazy_import('PIL.Image')
                 buy_icon = Image.open("buy-button.png")
                 sell_icon = Image.open("selling.png")
 
@@ -530,5 +516,94 @@ def main():
             except Exception as e:
                 st.error(f"Error during prediction: {e}")
 
+        perf.render_panel()
+        profiling.render_panel()
+
+    elif page == "Portfolio Risk":
+        import exposure
+        import panel
+
+        st.title("Portfolio Pip Value And Exposure 💼")
+
+        # Latest prices come from the last bar of the selected timeframe
+        timeframe = st.sidebar.radio('Select Timeframe', timeframes, index=1)
+        profiling.tag(timeframe=timeframe)
+        price_panel = panel.get_panel(timeframe)
+        if not len(price_panel):
+            st.error(f"No price data found for {timeframe}.")
+            return
+
+        # Positions file with `symbol` and signed `units` columns; one lot long per symbol by default
+        uploaded = st.sidebar.file_uploader('Positions CSV (symbol, units)', type='csv')
+        if uploaded is not None:
+            positions = pd.read_csv(uploaded)
+        else:
+            positions = pd.DataFrame({'symbol': symbols, 'units': 100000})
+
+        try:
+            risk = exposure.PortfolioRisk.from_frame(positions)
+        except (KeyError, ValueError) as e:
+            st.error(f"Invalid positions file: {e}")
+            return
+        with perf.timed('revalue', timeframe=timeframe):
+            summary = risk.revalue(exposure.latest_prices(price_panel))
+
+        st.write(f"{len(positions)} positions valued at the {timeframe} close of {price_panel.times[-1]}")
+        st.subheader('Per Symbol')
+        st.dataframe(summary)
+        st.subheader('Net Exposure Per Currency (USD)')
+        st.bar_chart(risk.currency_exposure())
+
+        perf.render_panel()
+        profiling.render_panel()
+
+    elif page == "Monte Carlo":
+        import montecarlo
+
+        st.title("Monte Carlo Simulation Of The BUY/SELL Rule 🎲")
+
+        symbol = st.sidebar.radio('Select Symbol', symbols)
+        timeframe = st.sidebar.radio('Select Timeframe', timeframes)
+        profiling.tag(symbol=symbol, timeframe=timeframe)
+        paths = st.sidebar.number_input('Paths', min_value=1000, max_value=1_000_000, value=montecarlo.DEFAULT_PATHS, step=1000)
+        horizon = st.sidebar.number_input('Horizon (bars)', min_value=10, max_value=10_000, value=montecarlo.DEFAULT_HORIZON, step=10)
+        block = st.sidebar.number_input('Block size (bars)', min_value=1, max_value=500, value=montecarlo.DEFAULT_BLOCK, step=1)
+
+        st.write(
+            f"Per-bar pips of the model's signal on {symbol} {timeframe} are block-bootstrapped into "
+            f"{paths:,} paths of {horizon} bars."
+        )
+        if st.button('Run Simulation'):
+            try:
+                with perf.timed('historical_returns', symbol, timeframe):
+                    returns = montecarlo.historical_returns(symbol, timeframe)
+            except FileNotFoundError as e:
+                st.error(f"Missing data or model file for {symbol} {timeframe}: {e.filename}")
+                return
+            except ValueError as e:
+                st.error(str(e))
+                return
+            # Runs in this process: forking worker processes from the server is not safe
+            with perf.timed('simulate', symbol, timeframe):
+                pnl, drawdown = montecarlo.simulate(returns, int(paths), int(horizon), int(block), workers=1)
+            table, stats = montecarlo.summarize(pnl, drawdown)
+
+            st.subheader('Distribution Percentiles (pips)')
+            st.dataframe(table)
+            st.write(stats)
+
+            counts, edges = np.histogram(pnl, bins=60)
+            st.subheader('Final PnL (pips)')
+            st.bar_chart(pd.Series(counts, index=np.round(edges[:-1], 1)))
+            counts, edges = np.histogram(drawdown, bins=60)
+            st.subheader('Maximum Drawdown (pips)')
+            st.bar_chart(pd.Series(counts, index=np.round(edges[:-1], 1)))
+
+        perf.render_panel()
+        profiling.render_panel()
+
+    startup.start_warmup()
+
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    with profiling.profile_rerun('Forex'):
+        main()
\ No newline at end of file
@@ -0,0 +1,271 @@
+"""Aligned multi-symbol price panel per timeframe.
+
+All nine symbols of a timeframe are aligned on the union of their bar timestamps, with one
+contiguous (time x symbol) float64 array per price field. Gaps are forward-filled: the close
+carries forward and open/high/low of a missing bar take the previous close (a flat bar);
+rows before a symbol's first bar stay NaN. The panel is built once per timeframe and
+extended in place with each symbol's newer bars, so cross-asset features read a single
+aligned block.
+"""
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+import market
+import perf
+
+FIELDS = ('open', 'high', 'low', 'close')
+
+_lock = threading.Lock()
+_panels = {}
+_stamps = {}  # (timeframe, symbol) -> (size, mtime) of the price file last loaded
+
+
+def forward_fill(values, observed, seed=None):
+    """Forward-fill a 2-D array down the time axis where ``observed`` is False.
+
+    ``seed`` is the row preceding ``values`` and fills gaps before the first observation.
+    """
+    rows = np.arange(len(values))[:, None]
+    last_seen = np.where(observed, rows, -1)
+    np.maximum.accumulate(last_seen, axis=0, out=last_seen)
+    filled = values[last_seen.clip(0), np.arange(values.shape[1])]
+    if seed is None:
+        seed = np.full(values.shape[1], np.nan)
+    return np.where(last_seen >= 0, filled, seed)
+
+
+def _align(bars_by_symbol, symbols):
+    """Align per-symbol bars on the union of their timestamps."""
+    parts = {}
+    for symbol in symbols:
+        bars = bars_by_symbol.get(symbol)
+        if bars is None or bars.empty:
+            continue
+        parts[symbol] = (market.bar_times(bars), bars)
+    if not parts:
+        return np.empty(0, dtype='datetime64[ns]'), {}, np.zeros((0, len(symbols)), dtype=bool)
+
+    union = np.unique(np.concatenate([times for times, _ in parts.values()]))
+    values = {field: np.full((len(union), len(symbols)), np.nan) for field in FIELDS}
+    observed = np.zeros((len(union), len(symbols)), dtype=bool)
+    for column, symbol in enumerate(symbols):
+        if symbol not in parts:
+            continue
+        times, bars = parts[symbol]
+        rows = np.searchsorted(union, times)
+        observed[rows, column] = True
+        for field in FIELDS:
+            values[field][rows, column] = bars[field].to_numpy(dtype=np.float64)
+    return union, values, observed
+
+
+class PricePanel:
+    """Price fields of several symbols aligned on a common timestamp index."""
+
+    def __init__(self, timeframe, symbols=market.symbols):
+        self.timeframe = timeframe
+        self.symbols = list(symbols)
+        self._column = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self._size = 0
+        self._times = np.empty(0, dtype='datetime64[ns]')
+        self._observed = np.zeros((0, len(self.symbols)), dtype=bool)
+        self._data = {field: np.empty((0, len(self.symbols))) for field in FIELDS}
+        # Timestamp of each symbol's last bar, NaT until it has one
+        self._last = np.full(len(self.symbols), np.datetime64('NaT'), dtype='datetime64[ns]')
+        # Incremented whenever rows already in the panel are re-aligned
+        self.rewrites = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def times(self):
+        return self._times[:self._size]
+
+    @property
+    def observed(self):
+        """True where the symbol had its own bar, False where the value was filled."""
+        return self._observed[:self._size]
+
+    def field(self, name):
+        """Return the aligned (time x symbol) array of one price field."""
+        return self._data[name][:self._size]
+
+    def column(self, name, symbol):
+        """Return one symbol's series of one field."""
+        return self.field(name)[:, self._column[symbol]]
+
+    def frame(self, name='close'):
+        """Return one field as a DataFrame indexed by time with a column per symbol."""
+        return pd.DataFrame(self.field(name), index=pd.DatetimeIndex(self.times), columns=self.symbols)
+
+    def rows_between(self, start=None, end=None):
+        """Return the row range [start, end) as a (lo, hi) pair of indices."""
+        lo = 0 if start is None else np.searchsorted(self.times, np.datetime64(pd.Timestamp(start), 'ns'))
+        hi = self._size if end is None else np.searchsorted(self.times, np.datetime64(pd.Timestamp(end), 'ns'))
+        return lo, hi
+
+    def _reserve(self, rows):
+        """Grow the buffers geometrically so repeated extends stay amortised O(new rows)."""
+        capacity = len(self._times)
+        if self._size + rows <= capacity:
+            return
+        capacity = max(self._size + rows, 2 * capacity, 1024)
+        times = np.empty(capacity, dtype='datetime64[ns]')
+        times[:self._size] = self.times
+        self._times = times
+        observed = np.zeros((capacity, len(self.symbols)), dtype=bool)
+        observed[:self._size] = self.observed
+        self._observed = observed
+        for name in FIELDS:
+            data = np.empty((capacity, len(self.symbols)))
+            data[:self._size] = self.field(name)
+            self._data[name] = data
+
+    def _new_bars(self, bars_by_symbol):
+        """Return each symbol's bars later than the last bar the panel holds for it."""
+        new = {}
+        for symbol, bars in bars_by_symbol.items():
+            column = self._column.get(symbol)
+            if column is None or bars is None or bars.empty:
+                continue
+            last = self._last[column]
+            if not np.isnat(last):
+                bars = bars.iloc[np.searchsorted(market.bar_times(bars), last, side='right'):]
+            if len(bars):
+                new[symbol] = bars
+        return new
+
+    def _observed_bars(self, lo):
+        """Return the bars each symbol contributed to the rows from ``lo`` on."""
+        bars = {}
+        for symbol, column in self._column.items():
+            rows = lo + np.flatnonzero(self.observed[lo:, column])
+            if len(rows):
+                bars[symbol] = pd.DataFrame(
+                    {'time': self._times[rows], **{name: self._data[name][rows, column] for name in FIELDS}}
+                )
+        return bars
+
+    def extend(self, bars_by_symbol):
+        """Add every bar newer than its symbol's last bar; returns the number of rows added.
+
+        A symbol that lags the others can bring bars at or before the panel's last row. The
+        rows from its earliest new bar on are then re-aligned together with the new bars,
+        and ``rewrites`` is incremented so incremental consumers know to resynchronise.
+        """
+        new = self._new_bars(bars_by_symbol)
+        if not new:
+            return 0
+        start = min(market.bar_times(bars)[0] for bars in new.values())
+        lo = int(np.searchsorted(self.times, start, side='left'))
+        if lo < self._size:
+            for symbol, bars in self._observed_bars(lo).items():
+                # The kept bars are all at or before the symbol's last bar, so order holds
+                new[symbol] = pd.concat([bars, new[symbol]], ignore_index=True) if symbol in new else bars
+            self.rewrites += 1
+
+        times, values, observed = _align(new, self.symbols)
+        previous_size = self._size
+        last_close = self.field('close')[lo - 1].copy() if lo else None
+        self._size = lo
+        self._reserve(len(times))
+        hi = lo + len(times)
+        self._times[lo:hi] = times
+        self._observed[lo:hi] = observed
+        close = forward_fill(values['close'], observed, last_close)
+        self._data['close'][lo:hi] = close
+        # A missing bar is a flat bar at the previous close
+        if last_close is None:
+            last_close = np.full(len(self.symbols), np.nan)
+        previous_close = np.vstack([last_close, close[:-1]])
+        for name in ('open', 'high', 'low'):
+            self._data[name][lo:hi] = np.where(observed, values[name], previous_close)
+        self._size = hi
+
+        seen = observed.any(axis=0)
+        last_row = len(times) - 1 - np.argmax(observed[::-1], axis=0)
+        self._last[seen] = times[last_row[seen]]
+        return hi - previous_size
+
+    def returns(self, periods=1, log=True, start=0):
+        """Return close-to-close returns over ``periods`` rows for the rows from ``start`` on.
+
+        Rows without ``periods`` predecessors are NaN.
+        """
+        close = self.field('close')
+        base = max(start - periods, 0)
+        close = close[base:]
+        out = np.full_like(close, np.nan)
+        if periods < len(close):
+            if log:
+                out[periods:] = np.log(close[periods:] / close[:-periods])
+            else:
+                out[periods:] = close[periods:] / close[:-periods] - 1.0
+        return out[start - base:]
+
+    def cross_asset_features(self, target, others=('USDX', 'EURX', 'XAUUSD'), lags=(1, 2)):
+        """Return lagged log returns of ``others`` aligned to the rows of ``target``."""
+        returns = self.returns()
+        features = {}
+        for symbol in others:
+            series = returns[:, self._column[symbol]]
+            for lag in lags:
+                lagged = np.full_like(series, np.nan)
+                lagged[lag:] = series[:-lag]
+                features[f'{symbol}_Return_Lag{lag}'] = lagged
+        frame = pd.DataFrame(features, index=pd.DatetimeIndex(self.times))
+        return frame[self.observed[:, self._column[target]]]
+
+
+def _file_stamp(symbol, timeframe):
+    """Return the size and mtime of a price file, or None when it does not exist."""
+    try:
+        stat = os.stat(market.get_dataframe_filename(symbol, timeframe))
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def load_symbol_bars(timeframe, symbols=market.symbols):
+    """Load the price fields of every symbol that has a file for ``timeframe``."""
+    bars = {}
+    for symbol in symbols:
+        stamp = _file_stamp(symbol, timeframe)
+        if stamp is not None:
+            with perf.timed('bars_load', symbol, timeframe):
+                bars[symbol] = market.load_bars(symbol, timeframe, FIELDS)
+            # Stamped before reading, so a write during the read is picked up next time
+            _stamps[(timeframe, symbol)] = stamp
+    return bars
+
+
+def get_panel(timeframe):
+    """Return the process-wide panel for ``timeframe``, building it on first use."""
+    with _lock:
+        panel = _panels.get(timeframe)
+        if panel is None:
+            panel = PricePanel(timeframe)
+            with perf.timed('panel_build', timeframe=timeframe):
+                panel.extend(load_symbol_bars(timeframe))
+            _panels[timeframe] = panel
+        return panel
+
+
+def update_panel(timeframe):
+    """Re-read the price files that changed since they were loaded and add their new bars.
+
+    Files are compared by size and mtime, so a rerun with unchanged files reads nothing.
+    """
+    panel = get_panel(timeframe)
+    with _lock:
+        changed = [
+            symbol for symbol in panel.symbols
+            if _file_stamp(symbol, timeframe) not in (None, _stamps.get((timeframe, symbol)))
+        ]
+        if not changed:
+            return 0
+        return panel.extend(load_symbol_bars(timeframe, changed))
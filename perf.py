@@ -0,0 +1,201 @@
+"""Per-stage timing for the Streamlit pages.
+
+Set FOREX_PERF=1 to turn it on. Stages are timed with ``timed(stage, symbol, timeframe)``
+and aggregated into histograms per (stage, symbol, timeframe). The histograms are served
+in Prometheus text format on FOREX_PERF_PORT (default 9464) and can be shown in the sidebar
+with ``render_panel()``. When disabled, ``timed`` returns a shared no-op context manager.
+"""
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+ENABLED = os.environ.get('FOREX_PERF', '0') == '1'
+METRICS_PORT = int(os.environ.get('FOREX_PERF_PORT', '9464'))
+
+# Upper bounds of the histogram buckets, in seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_NOOP = nullcontext()
+_lock = threading.Lock()
+_histograms = {}
+_server = None
+_server_error = None  # Set once binding the metrics port has failed
+
+
+class Histogram:
+    """Per-bucket counts plus the sum, count and max of observed durations."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        index = 0
+        while index < len(BUCKETS) and seconds > BUCKETS[index]:
+            index += 1
+        self.counts[index] += 1
+        self.total += seconds
+        self.count += 1
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q):
+        """Estimate a quantile by linear interpolation inside the matching bucket."""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for index, bucket_count in enumerate(self.counts):
+            upper = BUCKETS[index] if index < len(BUCKETS) else self.max
+            if bucket_count and seen + bucket_count >= rank:
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+            lower = upper
+        return self.max
+
+
+class _Span:
+    """Context manager that records its wall time into the matching histogram."""
+
+    __slots__ = ('key', 'start')
+
+    def __init__(self, key):
+        self.key = key
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(*self.key, seconds=time.perf_counter() - self.start)
+        return False
+
+
+def timed(stage, symbol='', timeframe=''):
+    """Time a block of code as ``stage`` for the given symbol and timeframe."""
+    if not ENABLED:
+        return _NOOP
+    return _Span((stage, symbol, timeframe))
+
+
+def observe(stage, symbol='', timeframe='', seconds=0.0):
+    """Record one duration for (stage, symbol, timeframe)."""
+    key = (stage, symbol, timeframe)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram()
+        histogram.observe(seconds)
+
+
+def snapshot():
+    """Return summary rows for every recorded (stage, symbol, timeframe)."""
+    with _lock:
+        items = sorted(_histograms.items())
+        return [
+            {
+                'stage': stage,
+                'symbol': symbol,
+                'timeframe': timeframe,
+                'count': h.count,
+                'mean_ms': 1000 * h.total / h.count,
+                'p50_ms': 1000 * h.quantile(0.5),
+                'p95_ms': 1000 * h.quantile(0.95),
+                'max_ms': 1000 * h.max,
+            }
+            for (stage, symbol, timeframe), h in items
+        ]
+
+
+def reset():
+    """Drop every recorded histogram."""
+    with _lock:
+        _histograms.clear()
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_prometheus():
+    """Render the histograms in the Prometheus text exposition format."""
+    lines = [
+        '# HELP forex_stage_seconds Time spent in each page stage.',
+        '# TYPE forex_stage_seconds histogram',
+    ]
+    with _lock:
+        for (stage, symbol, timeframe), h in sorted(_histograms.items()):
+            labels = f'stage="{_escape(stage)}",symbol="{_escape(symbol)}",timeframe="{_escape(timeframe)}"'
+            cumulative = 0
+            for bound, bucket_count in zip(BUCKETS, h.counts):
+                cumulative += bucket_count
+                lines.append(f'forex_stage_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'forex_stage_seconds_bucket{{{labels},le="+Inf"}} {h.count}')
+            lines.append(f'forex_stage_seconds_sum{{{labels}}} {h.total}')
+            lines.append(f'forex_stage_seconds_count{{{labels}}} {h.count}')
+    return '\n'.join(lines) + '\n'
+
+
+def serve_metrics(port=None):
+    """Start the local /metrics endpoint once per process; no-op when disabled.
+
+    A failed bind is remembered so later reruns do not retry it.
+    """
+    global _server, _server_error
+    if not ENABLED or _server is not None or _server_error is not None:
+        return _server
+    # Imported here so the http.server import stays off the cold-start path
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class _MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = render_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    with _lock:
+        if _server is None and _server_error is None:
+            try:
+                _server = ThreadingHTTPServer(('127.0.0.1', port or METRICS_PORT), _MetricsHandler)
+            except OSError as e:
+                # Typically another Streamlit process already owns the port
+                _server_error = e
+                return None
+            threading.Thread(target=_server.serve_forever, name='forex-metrics', daemon=True).start()
+    return _server
+
+
+def render_panel():
+    """Show the recorded timings in an optional sidebar panel."""
+    if not ENABLED:
+        return
+    import streamlit as st
+
+    if not st.sidebar.checkbox('Show performance panel', value=False):
+        return
+    rows = snapshot()
+    st.sidebar.subheader('Performance')
+    if not rows:
+        st.sidebar.write('No timings recorded yet.')
+        return
+    st.sidebar.dataframe(rows)
+    if _server is not None:
+        host, port = _server.server_address[:2]
+        st.sidebar.caption(f'Prometheus metrics: http://{host}:{port}/metrics')
+    elif _server_error is not None:
+        st.sidebar.caption(f'Metrics endpoint unavailable: {_server_error}')
+    if st.sidebar.button('Reset timings'):
+        reset()
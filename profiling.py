@@ -0,0 +1,214 @@
+"""Opt-in profiling of slow page reruns.
+
+Set FOREX_PROFILE_MS to a threshold in milliseconds to turn it on. Every rerun wrapped in
+``profile_rerun(page)`` is timed, and every rerun slower than the threshold is recorded
+with its page/symbol/timeframe tags under FOREX_PROFILE_DIR (default ``profiles``),
+keeping the newest FOREX_PROFILE_KEEP captures (default 20). By default every rerun runs
+under cProfile and tracemalloc, so a slow rerun that cannot be reproduced is still fully
+captured. Both add overhead; FOREX_PROFILE_SAMPLE=0.1 profiles only that fraction of
+reruns and FOREX_PROFILE_MEMORY=0 turns tracemalloc off. ``render_panel()`` summarises the
+captures.
+"""
+import cProfile
+import json
+import os
+import pstats
+import random
+import shutil
+import threading
+import time
+import tracemalloc
+from contextlib import nullcontext
+from datetime import datetime
+
+THRESHOLD_MS = float(os.environ.get('FOREX_PROFILE_MS', '0'))
+ENABLED = THRESHOLD_MS > 0
+PROFILE_DIR = os.environ.get('FOREX_PROFILE_DIR', 'profiles')
+MAX_CAPTURES = int(os.environ.get('FOREX_PROFILE_KEEP', '20'))
+SAMPLE_RATE = float(os.environ.get('FOREX_PROFILE_SAMPLE', '1.0'))
+TRACE_MEMORY = os.environ.get('FOREX_PROFILE_MEMORY', '1') == '1'
+
+_NOOP = nullcontext()
+_lock = threading.Lock()
+_local = threading.local()
+_tracing = 0  # Number of reruns currently relying on tracemalloc
+_owns_tracing = False
+_active = set()  # Captures currently relying on tracemalloc
+
+
+class _Capture:
+    """Profiles one rerun and writes it out if it exceeds the threshold."""
+
+    def __init__(self, page):
+        self.tags = {'page': page}
+        self.profiler = None
+        self.tracing = False
+        self.overlapped = False
+
+    def __enter__(self):
+        global _tracing, _owns_tracing
+        if TRACE_MEMORY:
+            with _lock:
+                if _tracing == 0:
+                    if not tracemalloc.is_tracing():
+                        tracemalloc.start()
+                        _owns_tracing = True
+                    tracemalloc.reset_peak()
+                else:
+                    # The peak now covers several reruns and is not reported
+                    self.overlapped = True
+                    for capture in _active:
+                        capture.overlapped = True
+                _tracing += 1
+                _active.add(self)
+            self.tracing = True
+        if random.random() < SAMPLE_RATE:
+            self.profiler = cProfile.Profile()
+            try:
+                self.profiler.enable()
+            except ValueError:
+                # Another rerun in this process is already being profiled
+                self.profiler = None
+        _local.capture = self
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        global _tracing, _owns_tracing
+        elapsed_ms = 1000 * (time.perf_counter() - self.start)
+        _local.capture = None
+        if self.profiler is not None:
+            self.profiler.disable()
+        try:
+            if elapsed_ms >= THRESHOLD_MS:
+                self._write(elapsed_ms)
+        finally:
+            if self.tracing:
+                with _lock:
+                    _tracing -= 1
+                    _active.discard(self)
+                    if _tracing == 0 and _owns_tracing:
+                        tracemalloc.stop()
+                        _owns_tracing = False
+        return False
+
+    def _write(self, elapsed_ms):
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+        name = '_'.join([stamp] + [str(self.tags[key]) for key in ('page', 'symbol', 'timeframe') if key in self.tags])
+        path = os.path.join(PROFILE_DIR, name)
+        os.makedirs(path, exist_ok=True)
+
+        peak = None
+        if self.tracing:
+            if not self.overlapped:
+                _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.take_snapshot().dump(os.path.join(path, 'alloc.tracemalloc'))
+        if self.profiler is not None:
+            self.profiler.dump_stats(os.path.join(path, 'profile.pstats'))
+
+        meta = dict(self.tags, elapsed_ms=elapsed_ms, peak_bytes=peak, profiled=self.profiler is not None,
+                    captured_at=stamp)
+        with open(os.path.join(path, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+        _rotate()
+
+
+def profile_rerun(page):
+    """Profile one rerun of ``page``; a no-op unless FOREX_PROFILE_MS is set."""
+    if not ENABLED:
+        return _NOOP
+    return _Capture(page)
+
+
+def tag(**tags):
+    """Attach tags such as symbol and timeframe to the rerun being profiled."""
+    capture = getattr(_local, 'capture', None)
+    if capture is not None:
+        capture.tags.update(tags)
+
+
+def _rotate():
+    """Delete the oldest captures beyond MAX_CAPTURES."""
+    with _lock:
+        names = sorted(os.listdir(PROFILE_DIR))
+        for name in names[:max(0, len(names) - MAX_CAPTURES)]:
+            shutil.rmtree(os.path.join(PROFILE_DIR, name), ignore_errors=True)
+
+
+def list_captures():
+    """Return the metadata of every stored capture, newest first."""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    captures = []
+    for name in sorted(os.listdir(PROFILE_DIR), reverse=True):
+        meta_file = os.path.join(PROFILE_DIR, name, 'meta.json')
+        if os.path.isfile(meta_file):
+            with open(meta_file) as f:
+                captures.append(dict(json.load(f), path=os.path.join(PROFILE_DIR, name)))
+    return captures
+
+
+def top_functions(path, limit=15):
+    """Return the functions with the highest cumulative time in a capture."""
+    stats_file = os.path.join(path, 'profile.pstats')
+    if not os.path.isfile(stats_file):
+        return []
+    stats = pstats.Stats(stats_file)
+    rows = [
+        {
+            'function': f'{func} ({os.path.basename(filename)}:{line})',
+            'calls': calls,
+            'own_ms': 1000 * own_time,
+            'cumulative_ms': 1000 * cumulative_time,
+        }
+        for (filename, line, func), (_, calls, own_time, cumulative_time, _) in stats.stats.items()
+    ]
+    rows.sort(key=lambda row: row['cumulative_ms'], reverse=True)
+    return rows[:limit]
+
+
+def top_allocations(path, limit=15):
+    """Return the source lines holding the most traced memory in a capture."""
+    snapshot_file = os.path.join(path, 'alloc.tracemalloc')
+    if not os.path.isfile(snapshot_file):
+        return []
+    snapshot = tracemalloc.Snapshot.load(snapshot_file)
+    return [
+        {
+            'location': f'{stat.traceback[0].filename}:{stat.traceback[0].lineno}',
+            'size_kb': stat.size / 1024,
+            'blocks': stat.count,
+        }
+        for stat in snapshot.statistics('lineno')[:limit]
+    ]
+
+
+def render_panel():
+    """Show the stored slow-rerun captures with their top functions and allocation sites."""
+    if not ENABLED:
+        return
+    import streamlit as st
+
+    captures = list_captures()
+    with st.expander(f'Slow rerun profiles (> {THRESHOLD_MS:.0f} ms)'):
+        if not captures:
+            st.write('No slow reruns captured yet.')
+            return
+        labels = [
+            f"{c['captured_at']} | {c.get('page', '')} {c.get('symbol', '')} {c.get('timeframe', '')} | {c['elapsed_ms']:.0f} ms"
+            for c in captures
+        ]
+        index = st.selectbox('Capture', range(len(captures)), format_func=lambda i: labels[i])
+        capture = captures[index]
+        if capture.get('peak_bytes') is not None:
+            st.write(f"Peak traced memory: {capture['peak_bytes'] / 1024 ** 2:.1f} MiB")
+        functions = top_functions(capture['path'])
+        allocations = top_allocations(capture['path'])
+        if functions:
+            st.write('Top functions')
+            st.dataframe(functions)
+        else:
+            st.write('This rerun was not sampled for cProfile; only its timing was recorded.')
+        if allocations:
+            st.write('Top allocation sites')
+            st.dataframe(allocations)
@@ -0,0 +1,183 @@
+"""Lazy loading of heavy modules, cached model/data loaders and the startup warm-up.
+
+Heavy modules (joblib, sklearn, plotly, PIL) are imported through ``lazy_import`` by the
+code paths that need them, which also records how long each first import took for
+``import_report()``. Set FOREX_WARMUP to a comma-separated list of model names such as
+``EURUSD_H1,USDJPY_M30,EUR`` to preload those models and their data in a background
+thread once the first page has been served.
+"""
+import importlib
+import os
+import sys
+import threading
+import time
+import warnings
+from collections import OrderedDict
+
+import perf
+
+WARMUP = [name.strip() for name in os.environ.get('FOREX_WARMUP', '').split(',') if name.strip()]
+FRAME_CACHE_SIZE = int(os.environ.get('FOREX_FRAME_CACHE', '8'))
+
+_lock = threading.Lock()
+_import_times = {}
+_models = {}
+_versions = {}
+_frames = OrderedDict()
+_warmup_thread = None
+
+
+def lazy_import(name):
+    """Import a module on first use and record how long the import took."""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    elapsed = time.perf_counter() - start
+    with _lock:
+        _import_times.setdefault(name, elapsed)
+    perf.observe('import', name, seconds=elapsed)
+    return module
+
+
+def import_report():
+    """Return the recorded first-import times, slowest first."""
+    with _lock:
+        rows = [{'module': name, 'import_ms': 1000 * seconds} for name, seconds in _import_times.items()]
+    return sorted(rows, key=lambda row: row['import_ms'], reverse=True)
+
+
+def load_model(filename, symbol='', timeframe=''):
+    """Load a model once and return the cached instance until its source file changes.
+
+    Models are taken from the packed archive (see ``model_archive.py``) when one exists,
+    otherwise from the individual pickle. A model trained with another scikit-learn version
+    is still loaded, with an InconsistentVersionWarning, and listed by ``model_versions()``.
+    Only actual loads are timed, as ``model_load`` for ``symbol`` (default: the model name).
+    """
+    model_archive = lazy_import('model_archive')
+    archive = model_archive.get_archive()
+    name = os.path.splitext(os.path.basename(filename))[0]
+    archived = archive is not None and name in archive
+    stamp = ('archive', archive.stamp) if archived else file_stamp(filename)
+    with _lock:
+        cached = _models.get(filename)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+    if archived:
+        with perf.timed('model_load', symbol or name, timeframe):
+            model = archive.load(name)
+        trained_version = archive.manifest['models'][name]['trained_sklearn_version']
+    else:
+        lazy_import('joblib')
+        exceptions = lazy_import('sklearn.exceptions')
+        with perf.timed('model_load', symbol or name, timeframe):
+            model, trained_version = model_archive.load_pickle(filename)
+        installed = lazy_import('sklearn').__version__
+        if trained_version != installed:
+            warnings.warn(exceptions.InconsistentVersionWarning(
+                estimator_name=name,
+                current_sklearn_version=installed,
+                original_sklearn_version=trained_version,
+            ), stacklevel=2)
+    with _lock:
+        _versions[filename] = trained_version
+        _models[filename] = (stamp, model)
+    return model
+
+
+def model_versions():
+    """Return the scikit-learn version each loaded model was trained with."""
+    with _lock:
+        return dict(_versions)
+
+
+def model_exists(filename):
+    """Return whether ``filename`` can be loaded, from the archive or as a pickle."""
+    if os.path.isfile(filename):
+        return True
+    archive = lazy_import('model_archive').get_archive()
+    return archive is not None and os.path.splitext(os.path.basename(filename))[0] in archive
+
+
+def file_stamp(filename):
+    """Return the size and mtime of ``filename``; raises FileNotFoundError when it is missing."""
+    stat = os.stat(filename)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def load_csv(filename, symbol='', timeframe=''):
+    """Read a CSV file through a small LRU cache; callers must not modify the result.
+
+    A cached frame is re-read once the file's size or mtime changes. Only actual reads are
+    timed, as ``csv_load`` for ``symbol`` (default: the file name) and ``timeframe``.
+    """
+    stamp = file_stamp(filename)
+    with _lock:
+        cached = _frames.get(filename)
+        if cached is not None and cached[0] == stamp:
+            _frames.move_to_end(filename)
+            return cached[1]
+    pd = lazy_import('pandas')
+    with perf.timed('csv_load', symbol or filename, timeframe):
+        df = pd.read_csv(filename)
+    with _lock:
+        _frames[filename] = (stamp, df)
+        _frames.move_to_end(filename)
+        while len(_frames) > FRAME_CACHE_SIZE:
+            _frames.popitem(last=False)
+    return df
+
+
+def _warmup_files(name):
+    """Return the model and data files belonging to a warm-up entry."""
+    if '_' in name:
+        market = lazy_import('market')
+        symbol, timeframe = name.split('_', 1)
+        return market.get_model_filename(symbol, timeframe), market.get_dataframe_filename(symbol, timeframe)
+    calendar_features = lazy_import('calendar_features')
+    return calendar_features.get_model_filename(name), calendar_features.get_encoder_filename(name)
+
+
+def _warmup():
+    for module in ('pandas', 'joblib', 'sklearn.exceptions', 'plotly.graph_objects', 'plotly.subplots'):
+        lazy_import(module)
+    for name in WARMUP:
+        model_file, data_file = _warmup_files(name)
+        with perf.timed('warmup', name):
+            if model_exists(model_file):
+                load_model(model_file)
+            if os.path.isfile(data_file):
+                load_csv(data_file)
+
+
+def start_warmup():
+    """Preload the FOREX_WARMUP models and data in the background, once per process."""
+    global _warmup_thread
+    if not WARMUP:
+        return
+    with _lock:
+        if _warmup_thread is None:
+            _warmup_thread = threading.Thread(target=_warmup, name='forex-warmup', daemon=True)
+            _warmup_thread.start()
+
+
+def render_import_report():
+    """Show the import times and stale model versions in the sidebar when timings are enabled."""
+    if not perf.ENABLED:
+        return
+    import streamlit as st
+
+    rows = import_report()
+    if rows:
+        st.sidebar.subheader('Import times')
+        st.sidebar.dataframe(rows)
+    installed = sys.modules['sklearn'].__version__ if 'sklearn' in sys.modules else None
+    stale = [
+        {'model': filename, 'trained_sklearn_version': version}
+        for filename, version in sorted(model_versions().items()) if version != installed
+    ]
+    if stale:
+        st.sidebar.subheader(f'Models not trained with scikit-learn {installed}')
+        st.sidebar.dataframe(stale)
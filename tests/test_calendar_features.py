@@ -0,0 +1,76 @@
+"""Cached batch scores must follow changes to the calendar and the models."""
+import os
+import sys
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LinearRegression
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import calendar_features  # noqa: E402
+import model_archive  # noqa: E402
+import startup  # noqa: E402
+
+EVENTS = ['CPI', 'GDP']
+
+
+def write_calendar(rows):
+    rng = np.random.default_rng(rows)
+    pd.DataFrame({
+        'Datetime': pd.date_range('2024-01-01', periods=rows, freq='D'),
+        'Currency': 'EUR',
+        'Event': [EVENTS[i % 2] for i in range(rows)],
+        'Impact': 'High',
+        'Previous': rng.normal(size=rows).round(2),
+        'Consensus': rng.normal(size=rows).round(2),
+        'Actual': rng.normal(size=rows).round(2),
+    }).to_csv(calendar_features.CALENDAR_FILE, index=False)
+
+
+def write_model(intercept):
+    features = pd.DataFrame(np.arange(14, dtype=float).reshape(2, 7), columns=calendar_features.FEATURES)
+    model = LinearRegression().fit(features, [0.0, 0.0])
+    model.intercept_ = intercept
+    joblib.dump(model, calendar_features.get_model_filename('EUR'))
+
+
+def bump_mtime(filename):
+    # Rewrites within the filesystem's timestamp resolution must still be seen as changes
+    stat = os.stat(filename)
+    os.utime(filename, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+@pytest.fixture
+def calendar(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(startup, '_models', {})
+    monkeypatch.setattr(startup, '_frames', type(startup._frames)())
+    monkeypatch.setattr(calendar_features, '_scored', {})
+    monkeypatch.setattr(model_archive, '_archive', None)
+    pd.DataFrame({'Impact': ['High'], 'Impact_encoder': [0]}).to_csv(calendar_features.IMPACT_FILE, index=False)
+    pd.DataFrame({'Event': EVENTS, 'N_Event_encoder': [0, 1]}).to_csv(
+        calendar_features.get_encoder_filename('EUR'), index=False
+    )
+    write_model(1.0)
+
+
+def test_scores_follow_a_growing_calendar(calendar):
+    write_calendar(5)
+    assert len(calendar_features.get_scored(['EUR'])['EUR']) == 5
+    write_calendar(10)
+    bump_mtime(calendar_features.CALENDAR_FILE)
+    assert len(calendar_features.get_scored(['EUR'])['EUR']) == 10
+
+
+def test_scores_follow_a_changed_model(calendar):
+    write_calendar(10)
+    before = calendar_features.get_scored(['EUR'])['EUR']['Prediction']
+    write_model(2.0)
+    bump_mtime(calendar_features.get_model_filename('EUR'))
+    after = calendar_features.get_scored(['EUR'])['EUR']['Prediction']
+    scored = before.notna()
+    assert scored.any()
+    np.testing.assert_allclose(after[scored], before[scored] + 1.0)
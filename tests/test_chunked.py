@@ -0,0 +1,70 @@
+"""Streamed features and backtest must match the in-memory computation for any chunk size."""
+import os
+import sys
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LinearRegression
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chunked  # noqa: E402
+import features  # noqa: E402
+import montecarlo  # noqa: E402
+import startup  # noqa: E402
+
+BARS = 120
+
+
+def write_history(shipped_indicators=False):
+    rng = np.random.default_rng(7)
+    close = 1.1 + np.cumsum(rng.normal(0, 1e-3, BARS))
+    open_price = np.r_[close[0], close[:-1]]
+    bars = pd.DataFrame({
+        'Time': pd.date_range('2024-01-01', periods=BARS, freq='h'),
+        'open': open_price,
+        'high': np.maximum(open_price, close) + 2e-4,
+        'low': np.minimum(open_price, close) - 2e-4,
+        'close': close,
+    })
+    if shipped_indicators:
+        shipped = features.indicators(bars['close'])[features.INDICATOR_COLUMNS]
+        bars = bars.join(shipped + 1e-5)
+    bars.to_csv('forex_EURUSD_H1.csv', index=False)
+
+
+@pytest.fixture
+def history(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(startup, '_models', {})
+    rng = np.random.default_rng(11)
+    model = LinearRegression().fit(rng.normal(size=(60, len(features.FEATURE_NAMES))), 1.1 + rng.normal(size=60))
+    joblib.dump(model, 'EURUSD_H1.pkl')
+    return write_history
+
+
+@pytest.mark.parametrize('shipped', [False, True])
+@pytest.mark.parametrize('chunk_size', [1, 2, 7, BARS])
+def test_streamed_features_match_memory(history, chunk_size, shipped):
+    history(shipped)
+    same_nan, difference = chunked.compare_with_memory('EURUSD', 'H1', chunk_size)
+    assert same_nan
+    assert difference < 1e-12
+
+
+@pytest.mark.parametrize('shipped', [False, True])
+@pytest.mark.parametrize('chunk_size', [1, 2, 7, BARS])
+def test_streamed_backtest_matches_memory(history, chunk_size, shipped):
+    history(shipped)
+    expected = montecarlo.historical_returns('EURUSD', 'H1')
+    streamed = np.concatenate(list(chunked.backtest_chunks('EURUSD', 'H1', chunk_size)))
+    np.testing.assert_allclose(streamed, expected)
+
+    totals = chunked.stream_backtest('EURUSD', 'H1', chunk_size)
+    equity = np.cumsum(expected)
+    assert totals['bars'] == len(expected) == BARS - 3
+    assert totals['pnl_pips'] == pytest.approx(equity[-1])
+    drawdown = np.maximum.accumulate(np.maximum(equity, 0.0)) - equity
+    assert totals['max_drawdown_pips'] == pytest.approx(drawdown.max())
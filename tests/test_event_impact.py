@@ -0,0 +1,57 @@
+"""The cached event/price join must follow changes to the calendar, in memory and on disk."""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import calendar_features  # noqa: E402
+import event_impact  # noqa: E402
+import market  # noqa: E402
+import startup  # noqa: E402
+
+
+def write_calendar(releases):
+    pd.DataFrame({
+        'Datetime': pd.date_range('2024-01-02 08:30', periods=releases, freq='D'),
+        'Currency': 'EUR',
+        'Event': 'CPI',
+        'Impact': 'High',
+        'Previous': 1.0,
+        'Consensus': 1.0,
+        'Actual': 1.5,
+    }).to_csv(calendar_features.CALENDAR_FILE, index=False)
+    # Rewrites within the filesystem's timestamp resolution must still be seen as changes
+    stat = os.stat(calendar_features.CALENDAR_FILE)
+    os.utime(calendar_features.CALENDAR_FILE, ns=(stat.st_atime_ns, stat.st_mtime_ns + releases * 10 ** 9))
+
+
+@pytest.fixture
+def sources(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(startup, '_frames', type(startup._frames)())
+    monkeypatch.setattr(event_impact, '_joined', {})
+    close = 1.1 + np.cumsum(np.random.default_rng(5).normal(0, 1e-3, 24 * 40))
+    pd.DataFrame({
+        'Time': pd.date_range('2024-01-01', periods=len(close), freq='h'),
+        'open': np.r_[close[0], close[:-1]],
+        'close': close,
+    }).to_csv(market.get_dataframe_filename('EURUSD', 'H1'), index=False)
+
+
+def test_join_follows_a_changed_calendar(sources):
+    write_calendar(5)
+    assert len(event_impact.get_joined('H1')) == 5
+
+    write_calendar(12)
+    assert len(event_impact.get_joined('H1')) == 12
+
+    # Only the current join is left on disk, and a fresh process reads that one
+    files = os.listdir(event_impact.CACHE_DIR)
+    assert len(files) == 1
+    event_impact._joined.clear()
+    startup._frames.clear()
+    assert len(event_impact.get_joined('H1')) == 12
@@ -0,0 +1,36 @@
+"""Position validation of the exposure engine."""
+import os
+import sys
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import exposure  # noqa: E402
+
+
+def test_blank_and_unknown_symbols_are_reported():
+    positions = pd.DataFrame({
+        'symbol': ['EURUSD', np.nan, 'FOO', None, 'EURUSD', np.nan],
+        'units': [100000, 1, 2, 3, -50000, 4],
+    })
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        with pytest.raises(ValueError) as raised:
+            exposure.PortfolioRisk.from_frame(positions)
+    message = str(raised.value)
+    assert message.startswith('Unknown symbols:')
+    assert 'FOO' in message
+    assert 'nan' in message
+    assert 'EURUSD' not in message
+
+
+def test_positions_are_netted_per_symbol():
+    risk = exposure.PortfolioRisk(['EURUSD', 'USDJPY', 'EURUSD'], [100000, 20000, -30000])
+    net = dict(zip(risk.universe, risk.net_units))
+    assert net['EURUSD'] == 70000
+    assert net['USDJPY'] == 20000
+    assert sum(net.values()) == 90000
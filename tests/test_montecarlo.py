@@ -0,0 +1,26 @@
+"""Memory of the Monte Carlo simulation must stay within its chunk budget."""
+import os
+import sys
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import montecarlo  # noqa: E402
+
+
+def test_peak_memory_follows_the_chunk_budget():
+    returns = np.random.default_rng(0).normal(size=3000)
+    budget = 8 * 1024 ** 2
+    horizon = 5000
+    chunk_size = montecarlo.paths_per_chunk(horizon, budget)
+    tracemalloc.start()
+    try:
+        pnl, drawdown = montecarlo.simulate(returns, 2000, horizon, 20, chunk_size=chunk_size, seed=3)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert len(pnl) == len(drawdown) == 2000
+    # The per-path results themselves are small; all the rest must fit in the budget
+    assert peak < budget + 2000 * 8 * 4
@@ -0,0 +1,70 @@
+"""Extending a panel in steps must give the same arrays as building it at once."""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import panel  # noqa: E402
+
+SYMBOLS = ['EURUSD', 'USDJPY', 'XAUUSD']
+BARS = 2000
+
+
+@pytest.fixture
+def bars():
+    rng = np.random.default_rng(1)
+    times = pd.date_range('2024-01-01', periods=BARS, freq='h')
+    out = {}
+    for symbol in SYMBOLS:
+        # Every symbol misses some bars, so rows are filled differently per symbol
+        keep = rng.random(BARS) > 0.05
+        close = 1 + np.cumsum(rng.normal(0, 1e-3, BARS))
+        out[symbol] = pd.DataFrame({
+            'time': times, 'open': close + 1e-4, 'high': close + 2e-4, 'low': close - 2e-4, 'close': close,
+        })[keep].reset_index(drop=True)
+    return out
+
+
+def assert_same(staged, full):
+    np.testing.assert_array_equal(staged.times, full.times)
+    np.testing.assert_array_equal(staged.observed, full.observed)
+    for name in panel.FIELDS:
+        np.testing.assert_array_equal(staged.field(name), full.field(name))
+
+
+def test_staggered_extends_match_a_single_build(bars):
+    full = panel.PricePanel('H1', SYMBOLS)
+    full.extend(bars)
+
+    staged = panel.PricePanel('H1', SYMBOLS)
+    # EURUSD stops five days early and XAUUSD lags far behind, then both catch up
+    cut = bars['EURUSD']['time'].iloc[-1] - pd.Timedelta(days=5)
+    staged.extend({
+        'EURUSD': bars['EURUSD'][bars['EURUSD']['time'] <= cut],
+        'USDJPY': bars['USDJPY'],
+        'XAUUSD': bars['XAUUSD'].iloc[:1200],
+    })
+    staged.extend({'XAUUSD': bars['XAUUSD'].iloc[:1600]})
+    staged.extend(bars)
+
+    assert staged.rewrites == 2
+    assert staged.observed[:, 0].sum() == len(bars['EURUSD'])
+    assert_same(staged, full)
+    assert staged.extend(bars) == 0
+
+
+def test_appending_in_time_order_does_not_rewrite(bars):
+    full = panel.PricePanel('H1', SYMBOLS)
+    full.extend(bars)
+
+    staged = panel.PricePanel('H1', SYMBOLS)
+    cut = pd.Timestamp('2024-02-01')
+    staged.extend({symbol: frame[frame['time'] < cut] for symbol, frame in bars.items()})
+    staged.extend(bars)
+
+    assert staged.rewrites == 0
+    assert_same(staged, full)